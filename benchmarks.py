@@ -0,0 +1,455 @@
+# Apache Airlines - Benchmarks
+# Description: Measures the speed of the booking system functions on a temporary database.
+# Usage: python benchmarks.py [name ...]
+# These are before/after micro benchmarks; load_simulator.py runs the reproducible workload suite.
+
+import asyncio # Import the asynchronous I/O module
+import json # Import the JSON module
+import os # Import the file path module
+import socket # Import the socket module
+import subprocess # Import the child process module
+import random # Import the Generate Random Numbers module
+import string # Import the string processing module
+import sys # Import the command line arguments module
+import sqlite3 # Import SQLite Database Module
+import tempfile # Import the temporary directory module
+import threading # Import the threading module
+import time # Import the timing module
+import tracemalloc # Import the memory allocation tracer
+
+import booking_system # Import the booking system being measured
+from load_simulator import seed_database # Import the database seeding helper
+
+def _ops_per_sec(func, count):
+    """
+    Calls func(i) for i in range(count) and returns the number of calls per second.
+    """
+    start = time.perf_counter()
+    for i in range(count):
+        func(i)
+    return count / (time.perf_counter() - start)
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def _report(title, before, after):
+    print(f"{title:<22} before: {before:>10,.0f} ops/s   after: {after:>10,.0f} ops/s   x{after / before:.1f}")
+
+# ----------- Connection Pool -----------
+def bench_connection_pool(count=2000):
+    """
+    Compares opening a connection per operation (the old behaviour) with the pooled connections.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        old_db = os.path.join(tmp, "before.db")   # Default rollback journal, as the old code left it
+        conn = sqlite3.connect(old_db)
+        conn.execute("CREATE TABLE bookings(id TEXT PRIMARY KEY, name TEXT NOT NULL, passport TEXT NOT NULL, "
+                     "seat TEXT NOT NULL, meal TEXT)")
+        conn.close()
+        db_name = os.path.join(tmp, "after.db")
+        booking_system.initial_database(db_name)
+
+        def lookup_before(i):
+            conn = sqlite3.connect(old_db)   # Fresh connection per lookup
+            conn.execute("SELECT * FROM bookings WHERE seat = ?", (f"{i % 10 + 1}A",)).fetchone()
+            conn.close()
+
+        def reserve_before(i):
+            conn = sqlite3.connect(old_db)   # Fresh connection per reservation
+            conn.execute("INSERT INTO bookings (id, name, passport, seat, meal) VALUES (?, ?, ?, ?, ?)",
+                         (f"B{i:07d}", "Bench", "P0000000", f"{i}B", "Standard"))
+            conn.commit()
+            conn.close()
+
+        def lookup_after(i):
+            booking_system.is_seat_reserved(f"{i % 10 + 1}A", db_name)
+
+        def reserve_after(i):
+            booking_system.save_booking(f"A{i:07d}", "Bench", "P0000000", f"{i}C", "Standard", db_name)
+
+        _report("seat lookup", _ops_per_sec(lookup_before, count), _ops_per_sec(lookup_after, count))
+        _report("reservation", _ops_per_sec(reserve_before, count), _ops_per_sec(reserve_after, count))
+        booking_system.close_pool(db_name)
+
+# ----------- Seat Map -----------
+def bench_seat_map(count=2000):
+    """
+    Compares drawing the seat map with one query per seat against one query for the whole aircraft.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        booking_system.initial_database(db_name)
+        seats = [seat for seat, _ in booking_system.SeatMap().seats()]
+
+        def per_seat(i):
+            for seat in seats:
+                booking_system.is_seat_reserved(seat, db_name)   # One query per seat
+
+        def single_query(i):
+            booking_system.get_seat_map(db_name)   # One query for every seat
+
+        _report("seat map", _ops_per_sec(per_seat, count), _ops_per_sec(single_query, count))
+        booking_system.close_pool(db_name)
+
+# ----------- Booking Numbers -----------
+def bench_booking_ids(count=1_000_000, stress=5_000_000):
+    """
+    Compares the old random booking numbers with the block allocator, one at a time and in batches,
+    then checks that stress consecutive allocations contain no collision.
+    """
+    alphabet = string.ascii_uppercase + string.digits
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        booking_system.initial_database(db_name)
+        allocator = booking_system.BookingIdAllocator(db_name)
+        before = _ops_per_sec(lambda i: ''.join(random.choices(alphabet, k=8)), count)
+        _report("single ID", before, _ops_per_sec(lambda i: allocator.next_id(), count))
+        start = time.perf_counter()
+        for _ in range(count // 10_000):
+            allocator.allocate(10_000)   # Pre-generated batches for bulk inserts
+        _report("batched IDs", before, count / (time.perf_counter() - start))
+
+        start = time.perf_counter()
+        ids = set()
+        for _ in range(stress // 100_000):
+            ids.update(allocator.allocate(100_000))
+        elapsed = time.perf_counter() - start
+        print(f"collision stress: {stress:,} IDs, {stress - len(ids)} collisions, {elapsed:.1f}s")
+        booking_system.close_pool(db_name)
+
+# ----------- Bulk Reservations -----------
+def bench_bulk_reservations(count=5000):
+    """
+    Compares reserving a charter group one passenger at a time with one reserve_many() call,
+    and the old list-based seat validation with the precomputed layout lookup.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        booking_system.initial_database(db_name)
+        booking_system.add_flight("ONE", 1000, "ABCDEFGHJK", db_name)
+        booking_system.add_flight("BULK", 1000, "ABCDEFGHJK", db_name)
+        layout = booking_system.get_flight_layout("ONE", db_name)
+        seats = [layout.seat_at(i) for i in range(count)]
+
+        before = _ops_per_sec(lambda i: booking_system.reserve("Bench", "P0", seats[i], "Standard", db_name, "ONE"),
+                              count)
+        start = time.perf_counter()
+        ids, failures = booking_system.reserve_many((("Bench", "P0", seat, "Standard") for seat in seats),
+                                                    db_name, "BULK")
+        assert len(ids) == count and not failures
+        _report("group booking", before, count / (time.perf_counter() - start))
+
+        before = _ops_per_sec(lambda i: seats[i] in [f"{r}A" for r in range(1, 11)], count)
+        _report("seat validation", before, _ops_per_sec(lambda i: booking_system.is_valid_seat_format(seats[i], layout),
+                                                        count))
+        booking_system.close_pool(db_name)
+
+# ----------- Booking Manifest -----------
+def bench_manifest(sizes=(10_000, 100_000, 1_000_000)):
+    """
+    Shows the peak Python memory of reading a whole manifest with fetchall() (the old behaviour)
+    against streaming it with iter_bookings(), for growing numbers of bookings.
+    """
+    for count in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_name = os.path.join(tmp, "bench.db")
+            seed_database(db_name, count)
+
+            def read_all():
+                with booking_system.get_pool(db_name).connection() as conn:
+                    return conn.execute("SELECT * FROM bookings").fetchall()
+
+            results = []
+            for read in (read_all, lambda: sum(1 for _ in booking_system.iter_bookings(db_name))):
+                start = time.perf_counter()
+                read()
+                elapsed = time.perf_counter() - start
+                tracemalloc.start()   # Second run under the tracer, which slows every allocation down.
+                read()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                results.append((peak / 2 ** 20, count / elapsed))
+            (old_peak, old_rate), (new_peak, new_rate) = results
+            print(f"{count:>10,} bookings   fetchall: {old_peak:8.1f} MiB {old_rate:>10,.0f} rows/s   "
+                  f"streamed: {new_peak:6.2f} MiB {new_rate:>10,.0f} rows/s")
+            booking_system.close_pool(db_name)
+
+# ----------- Booking Records -----------
+def bench_records(count=1_000_000):
+    """
+    Compares loading a whole manifest as plain tuples with the meal spelled out in every row (the old behaviour)
+    with Booking records built by booking_factory(): memory held by the loaded rows, and rows per second.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        seed_database(db_name, count)
+
+        def load(row_factory, sql):
+            with booking_system.get_pool(db_name).connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = row_factory
+                return cursor.execute(sql).fetchall()
+
+        for title, row_factory, sql in (
+                ("tuples", None, "SELECT b.id, b.name, b.passport, b.seat, m.label, b.flight FROM bookings b "
+                                 "LEFT JOIN meals m ON m.code = b.meal_code"),
+                ("Booking records", booking_system.booking_factory(db_name),
+                 f"SELECT {booking_system.BOOKING_COLUMNS} FROM bookings")):
+            start = time.perf_counter()
+            rows = load(row_factory, sql)
+            elapsed = time.perf_counter() - start
+            del rows
+            tracemalloc.start()   # Second load under the tracer, which slows every allocation down.
+            rows = load(row_factory, sql)
+            held = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del rows
+            print(f"{title:<16} {held / 2 ** 20:8.1f} MiB held   {held / count:6.1f} bytes/row   "
+                  f"{count / elapsed:>10,.0f} rows/s")
+        booking_system.close_pool(db_name)
+
+# ----------- Import and Export -----------
+def bench_transfer(count=2_000_000):
+    """
+    Exports a seeded manifest to CSV and JSON lines, then imports each file into an empty database,
+    with and without the fast path, and prints rows per second.
+    """
+    import booking_transfer   # Imported here: only this benchmark needs it.
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        flights = seed_database(db_name, count)
+        for fmt in ("csv", "jsonl"):
+            path = os.path.join(tmp, f"bookings.{fmt}")
+            start = time.perf_counter()
+            booking_transfer.export_bookings(path, db_name)
+            print(f"export {fmt:<5}          {count / (time.perf_counter() - start):>10,.0f} rows/s   "
+                  f"{os.path.getsize(path) / 2 ** 20:,.0f} MiB")
+            for fast in (False, True):
+                target = os.path.join(tmp, f"import-{fmt}-{fast}.db")
+                seed_database(target, 0, flights)   # Same flights, no bookings.
+                start = time.perf_counter()
+                imported, _, _ = booking_transfer.import_bookings(path, target, fast=fast)
+                print(f"import {fmt:<5} {'fast' if fast else 'safe'}     {imported / (time.perf_counter() - start):>10,.0f} rows/s")
+                booking_system.close_pool(target)
+        booking_system.close_pool(db_name)
+
+# ----------- Passenger Lookup -----------
+def bench_lookup(count=1_000_000, lookups=2000):
+    """
+    Compares passport and name-prefix lookups done as full table scans (the old behaviour, forced with
+    NOT INDEXED) with find_by_passport() and search_by_name() on a seeded manifest.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        seed_database(db_name, count)
+
+        def scan(sql, params):
+            with booking_system.get_pool(db_name).connection() as conn:
+                return conn.execute(sql, params).fetchall()
+
+        scans = max(1, lookups // 200)   # Each scan reads every row, so run fewer of them.
+        for title, before, after in (
+                ("passport lookup",
+                 lambda i: scan("SELECT * FROM bookings NOT INDEXED WHERE passport = ?", (f"P{i * 7919 % count:08d}",)),
+                 lambda i: booking_system.find_by_passport(f"P{i * 7919 % count:08d}", db_name)),
+                ("name prefix search",
+                 lambda i: scan("SELECT * FROM bookings NOT INDEXED WHERE name LIKE ? LIMIT 20",
+                                (f"passenger {i * 7919 % count}%",)),
+                 lambda i: booking_system.search_by_name(f"passenger {i * 7919 % count}", db_name))):
+            _report(title, _ops_per_sec(before, scans), _ops_per_sec(after, lookups))
+        booking_system.close_pool(db_name)
+
+# ----------- Seat Availability Cache -----------
+def bench_seat_cache(count=50_000):
+    """
+    Compares seat lookups and seat maps read from disk with the same reads served by the availability cache,
+    with one reservation for every 20 reads, and prints the cache counters.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        booking_system.initial_database(db_name)
+        booking_system.add_flight("CACHE", 100, "ABCDEFGHJK", db_name)
+        layout = booking_system.get_flight_layout("CACHE", db_name)
+
+        def workload(i):
+            seat = layout.seat_at(i * 7 % layout.size)
+            if i % 20 == 0:
+                booking_system.reserve("Bench", "P0", seat, "Standard", db_name, "CACHE")
+            elif i % 20 == 1:
+                booking_system.get_seat_map(db_name, "CACHE")
+            else:
+                booking_system.is_seat_reserved(seat, db_name, "CACHE")
+
+        before = _ops_per_sec(workload, count)
+        with booking_system.get_pool(db_name).connection() as conn:
+            conn.execute("DELETE FROM bookings")   # Same starting point for the second run
+        cache = booking_system.enable_seat_cache()
+        _report("mixed reads", before, _ops_per_sec(workload, count))
+        print("cache:", cache.stats())
+        booking_system.disable_seat_cache()
+        booking_system.close_pool(db_name)
+
+# ----------- Instrumentation -----------
+def bench_metrics(count=50_000):
+    """
+    Measures the cost of the instrumentation on seat lookups: undecorated, metrics off, metrics on,
+    and metrics on with the SQL trace.
+    """
+    from booking_metrics import metrics
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        booking_system.initial_database(db_name)
+        raw = booking_system.is_seat_reserved.__wrapped__   # The function without the decorator
+        base = _ops_per_sec(lambda i: raw("1A", db_name), count)
+        _report("metrics off", base, _ops_per_sec(lambda i: booking_system.is_seat_reserved("1A", db_name), count))
+        metrics.enable()
+        _report("metrics on", base, _ops_per_sec(lambda i: booking_system.is_seat_reserved("1A", db_name), count))
+        metrics.enable_sql_trace(lambda sql: None, progress_steps=100)
+        _report("metrics + SQL trace", base,
+                _ops_per_sec(lambda i: booking_system.is_seat_reserved("1A", db_name), count))
+        metrics.disable_sql_trace()
+        metrics.disable()
+        booking_system.close_pool(db_name)
+
+# ----------- Group Commit -----------
+def bench_group_commit(callers=32, per_caller=200, batch_sizes=(1, 16, 64, 256)):
+    """
+    callers threads each make per_caller durable reservations through a GroupCommitQueue.
+    A batch size of 1 is one commit (and one fsync) per booking, as before; larger batches share commits.
+    """
+    for batch_size in batch_sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_name = os.path.join(tmp, "bench.db")
+            booking_system.initial_database(db_name)
+            booking_system.add_flight("RUSH", 1000, "ABCDEFGHJK", db_name)
+            layout = booking_system.get_flight_layout("RUSH", db_name)
+            writes = booking_system.GroupCommitQueue(db_name, max_batch=batch_size)
+
+            def caller(number):
+                futures = [writes.reserve("Bench", "P0", layout.seat_at(number * per_caller + i), "Standard", "RUSH")
+                           for i in range(per_caller)]
+                for future in futures:
+                    future.result()
+
+            threads = [threading.Thread(target=caller, args=(number,)) for number in range(callers)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            writes.close()
+            print(f"batch {batch_size:>4}: {writes.operations / elapsed:>10,.0f} bookings/s   "
+                  f"{writes.commits / elapsed:>8,.0f} commits/s")
+            booking_system.close_pool(db_name)
+
+# ----------- Booking Server -----------
+async def run_load(host, port, clients=200, requests_per_client=50, flight="LOAD", seats=1000):
+    """
+    Load generator for booking_server.py: clients connections each send requests_per_client requests
+    (60% seat maps, 20% reservations, 10% lookups, 10% cancellations) one after the other.
+    Returns the latency of every request in seconds and the total elapsed time.
+    """
+    layout = booking_system.seat_layout(seats // 10, "ABCDEFGHJK")
+    latencies = []
+
+    async def client(number):
+        rng = random.Random(number)   # Reproducible request mix per client
+        reader, writer = await asyncio.open_connection(host, port)
+        booked = []
+        for _ in range(requests_per_client):
+            roll = rng.random()
+            if roll < 0.6:
+                request = {"op": "seat_map", "flight": flight}
+            elif roll < 0.8 or not booked:
+                request = {"op": "reserve", "name": f"Client {number}", "passport": f"P{number:06d}",
+                           "seat": layout.seat_at(rng.randrange(layout.size)), "flight": flight}
+            elif roll < 0.9:
+                request = {"op": "lookup", "booking_id": rng.choice(booked)}
+            else:
+                request = {"op": "cancel", "booking_id": booked.pop()}
+            start = time.perf_counter()
+            writer.write(json.dumps(request).encode() + b"\n")
+            reply = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - start)
+            if request["op"] == "reserve" and reply["ok"]:
+                booked.append(reply["result"]["booking_id"])
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(clients)))
+    return latencies, time.perf_counter() - start
+
+def bench_server(clients=200, requests_per_client=50):
+    """
+    Starts booking_server.py in its own process on a temporary database and drives it with run_load().
+    Prints p50 and p99 latency and throughput.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        booking_system.initial_database(db_name)
+        booking_system.add_flight("LOAD", 100, "ABCDEFGHJK", db_name)
+        booking_system.close_pool(db_name)
+        with socket.socket() as probe:   # Find a free port for the server
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                "booking_server.py"),
+                                   "--db", db_name, "--port", str(port)], stdout=subprocess.DEVNULL)
+        try:
+            for _ in range(100):   # Wait for the server to start listening
+                try:
+                    socket.create_connection(("127.0.0.1", port)).close()
+                    break
+                except OSError:
+                    time.sleep(0.05)
+            latencies, elapsed = asyncio.run(run_load("127.0.0.1", port, clients, requests_per_client))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{clients} clients, {len(latencies):,} requests: {len(latencies) / elapsed:,.0f} req/s   "
+              f"p50 {_percentile(latencies, 0.5) * 1000:.2f} ms   p99 {_percentile(latencies, 0.99) * 1000:.2f} ms")
+
+# ----------- Sharding -----------
+def bench_shards(shard_counts=(1, 2, 4, 8), flights=64, count=20_000):
+    """
+    Prints reservation throughput of a ShardedBookingStore as the number of shards (and worker processes) grows.
+    Every reservation is queued at once and spread evenly over the flights. Gains need as many free cores as shards.
+    """
+    from booking_shards import ShardedBookingStore   # Imported here: only this benchmark starts worker processes.
+    print(f"{os.cpu_count()} CPUs")
+    names = [f"SH{number:04d}" for number in range(flights)]
+    for shards in shard_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            with ShardedBookingStore(os.path.join(tmp, "bench.db"), shards) as store:
+                for flight in names:
+                    store.add_flight(flight, 60, "ABCDEF")
+                seats = booking_system.seat_layout(60, "ABCDEF")
+                start = time.perf_counter()
+                futures = [store.submit_reserve("Bench", "P0", seats.seat_at(i // flights % seats.size), "Standard",
+                                                names[i % flights]) for i in range(count)]
+                booked = sum(future.result() is not None for future in futures)
+                elapsed = time.perf_counter() - start
+            print(f"{shards:>3} shards: {booked / elapsed:>10,.0f} reservations/s")
+
+BENCHMARKS = {
+    "pool": bench_connection_pool,
+    "seatmap": bench_seat_map,
+    "ids": bench_booking_ids,
+    "bulk": bench_bulk_reservations,
+    "manifest": bench_manifest,
+    "lookup": bench_lookup,
+    "records": bench_records,
+    "transfer": bench_transfer,
+    "cache": bench_seat_cache,
+    "metrics": bench_metrics,
+    "groupcommit": bench_group_commit,
+    "server": bench_server,
+    "shards": bench_shards,
+}
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or BENCHMARKS:
+        print(f"\n=== {name} ===")
+        BENCHMARKS[name]()
@@ -0,0 +1,183 @@
+# Apache Airlines - Booking Metrics
+# Description: Lightweight latency histograms and counters for the booking system's hot paths.
+#
+# Metrics are off by default and then cost one attribute check per instrumented call.
+#   import booking_metrics
+#   booking_metrics.metrics.enable()
+#   ... use booking_system ...
+#   booking_metrics.metrics.dump("metrics.prom")            # Prometheus text format
+#   booking_metrics.metrics.dump("metrics.json", "json")    # JSON snapshot
+#   booking_metrics.metrics.dump(("127.0.0.1", 9100))       # Send the snapshot to a socket
+
+import bisect # Import the sorted list search module
+import json # Import the JSON module
+import threading # Import the threading module
+import time # Import the timing module
+from functools import wraps # Import the decorator helper
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket catches everything slower.
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram: a count per bucket plus the total count and sum.
+    """
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def snapshot(self):
+        return {"count": self.count, "sum": self.total,
+                "buckets": dict(zip([*map(str, LATENCY_BUCKETS), "+Inf"], self.buckets))}
+
+class Metrics:
+    """
+    Per-operation latency histograms plus statement, commit and connection counters.
+    Statement counting and the optional SQL trace use sqlite3's trace and progress callbacks, which are
+    attached to a connection the next time it is borrowed after metrics or tracing are switched on or off.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.hook_version = 0   # Bumped whenever the callbacks connections should carry change.
+        self._lock = threading.Lock()
+        self._sql_callback = None   # Receives every statement while the SQL trace is on.
+        self._progress_steps = 0
+        self.reset()
+
+    # ----------- Switches -----------
+    def enable(self):
+        self.enabled = True
+        self.hook_version += 1
+
+    def disable(self):
+        self.enabled = False
+        self.hook_version += 1
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}   # Operation name -> Histogram.
+            self.counters = {"statements": 0, "commits": 0, "rollbacks": 0, "connections_opened": 0,
+                             "vm_progress_calls": 0}
+
+    def enable_sql_trace(self, callback=print, progress_steps=0):
+        """
+        Passes every SQL statement run by the booking system to callback (print by default).
+        With progress_steps, also counts SQLite progress callbacks, one per that many virtual machine steps,
+        which shows how much work each query does.
+        """
+        self._sql_callback = callback
+        self._progress_steps = progress_steps
+        self.hook_version += 1
+
+    def disable_sql_trace(self):
+        self._sql_callback = None
+        self._progress_steps = 0
+        self.hook_version += 1
+
+    # ----------- Recording -----------
+    def observe(self, operation, seconds):
+        with self._lock:
+            histogram = self.histograms.get(operation)
+            if histogram is None:
+                histogram = self.histograms[operation] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, counter, amount=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def hook(self, conn):
+        """
+        Sets the trace and progress callbacks of a connection to match the current switches.
+        """
+        statement_counter = self._count_statement if self.enabled else None
+        sql_callback = self._sql_callback
+        if statement_counter and sql_callback:
+            conn.set_trace_callback(lambda sql: (statement_counter(sql), sql_callback(sql)))
+        else:
+            conn.set_trace_callback(statement_counter or sql_callback)
+        if self._progress_steps:
+            conn.set_progress_handler(self._count_progress, self._progress_steps)
+        else:
+            conn.set_progress_handler(None, 0)
+        conn.hook_version = self.hook_version
+
+    def _count_statement(self, sql):
+        self.counters["statements"] += 1   # Runs on every statement, so no lock: an approximate count is enough.
+
+    def _count_progress(self):
+        self.counters["vm_progress_calls"] += 1
+        return 0   # Zero lets the query carry on.
+
+    # ----------- Export -----------
+    def snapshot(self):
+        with self._lock:
+            return {"counters": dict(self.counters),
+                    "operations": {name: histogram.snapshot() for name, histogram in sorted(self.histograms.items())}}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """
+        Formats the snapshot in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            lines += [f"# TYPE booking_{name}_total counter", f"booking_{name}_total {value}"]
+        lines.append("# TYPE booking_operation_seconds histogram")
+        for operation, histogram in snapshot["operations"].items():
+            cumulative = 0
+            for bound, count in histogram["buckets"].items():
+                cumulative += count
+                lines.append(f'booking_operation_seconds_bucket{{operation="{operation}",le="{bound}"}} {cumulative}')
+            lines.append(f'booking_operation_seconds_sum{{operation="{operation}"}} {histogram["sum"]}')
+            lines.append(f'booking_operation_seconds_count{{operation="{operation}"}} {histogram["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, target, fmt="prometheus"):
+        """
+        Writes a snapshot ("prometheus" or "json") to a file path, or sends it to a (host, port) TCP address
+        or a Unix socket path prefixed with "unix:".
+        """
+        import socket   # Imported here, not at the top: only dumps to a socket need it.
+        text = self.to_json() if fmt == "json" else self.to_prometheus()
+        if isinstance(target, tuple):
+            with socket.create_connection(target) as sock:
+                sock.sendall(text.encode())
+        elif target.startswith("unix:"):
+            with socket.socket(socket.AF_UNIX) as sock:
+                sock.connect(target[len("unix:"):])
+                sock.sendall(text.encode())
+        else:
+            with open(target, "w") as file:
+                file.write(text)
+
+metrics = Metrics()   # The process-wide metrics used by booking_system.
+
+def instrumented(operation):
+    """
+    Decorator that records the latency of every call in the operation's histogram while metrics are enabled.
+    """
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                metrics.observe(operation, time.perf_counter() - start)
+        return wrapper
+    return decorate
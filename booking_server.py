@@ -0,0 +1,200 @@
+# Apache Airlines - Booking Server
+# Description: Serves the booking system to many clients at once over a JSON-lines socket protocol.
+# Usage: python booking_server.py [--host HOST] [--port PORT | --unix PATH] [--db DB]
+#
+# Each request is one JSON object per line, e.g.
+#   {"op": "reserve", "name": "Ann", "passport": "P1", "seat": "3A", "meal": "Halal", "flight": "AA001"}
+#   {"op": "cancel", "booking_id": "GS4JNY8P"}
+#   {"op": "seat_map", "flight": "AA001"}   -> occupancy string, '1' reserved, 'H' held, '0' free, in row order
+#   {"op": "hold", "seat": "3A", "flight": "AA001"}   -> hold_id to send with the reserve ("hold_id": ...)
+#   {"op": "release", "hold_id": "..."}
+#   {"op": "lookup", "booking_id": "GS4JNY8P"}
+#   {"op": "search", "passport": "P1"} or {"op": "search", "name": "an"}   -> matching bookings, name by prefix
+#   {"op": "metrics"}   -> booking_metrics snapshot (empty unless metrics are enabled, e.g. with --metrics)
+# and each reply is one JSON object per line: {"ok": true, "result": ...} or {"ok": false, "error": "..."}.
+# A request may carry a "tag" value, which is copied into its reply.
+
+import argparse # Import the command line parsing module
+import asyncio # Import the asynchronous I/O module
+import json # Import the JSON module
+from concurrent.futures import ThreadPoolExecutor # Import the thread pool executor
+
+import booking_system # Import the booking functions being served
+from booking_metrics import metrics # Import the instrumentation snapshot
+
+READ_WORKERS = 8   # Threads running SQLite reads at the same time.
+WRITE_QUEUE_SIZE = 1024   # Writes in flight before clients are made to wait.
+BOOKING_FIELDS = ("booking_id", "name", "passport", "seat", "meal", "flight")   # Keys of a booking in replies.
+BACKLOG = 1024   # Connections the OS may queue before accept(), so bursts of new clients are not dropped.
+
+class BookingServer:
+    """
+    Asyncio front-end over booking_system.
+    Reads run on a bounded thread pool; every write goes through one GroupCommitQueue, whose single thread
+    commits the writes of many clients together, so SQLite never sees two writers from this process at once.
+    The only exception is the hold sweeper thread, which briefly deletes expired holds (see SeatHoldSweeper).
+    """
+
+    def __init__(self, db_name=booking_system.DEFAULT_DB, read_workers=READ_WORKERS):
+        self.db_name = db_name
+        self._readers = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="booking-read")
+        self._writes = None   # GroupCommitQueue, created once the database is initialised.
+        self._write_slots = None   # asyncio.Semaphore bounding the writes in flight.
+        self._server = None
+        self._operations = {
+            "reserve": self._reserve,
+            "cancel": self._cancel,
+            "seat_map": self._seat_map,
+            "hold": self._hold,
+            "release": self._release,
+            "lookup": self._lookup,
+            "search": self._search,
+            "metrics": self._metrics,
+        }
+
+    # ----------- Start and Stop -----------
+    async def start(self, host="127.0.0.1", port=8765, path=None):
+        """
+        Initialises the database and starts listening on a TCP port, or on a Unix socket if path is given.
+        Returns the asyncio server (its sockets give the port actually bound when port is 0).
+        """
+        await self._read(booking_system.initial_database, self.db_name)
+        self._writes = booking_system.GroupCommitQueue(self.db_name)
+        self._write_slots = asyncio.Semaphore(WRITE_QUEUE_SIZE)
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_client, path=path, backlog=BACKLOG)
+        else:
+            self._server = await asyncio.start_server(self._handle_client, host, port, backlog=BACKLOG)
+        return self._server
+
+    async def close(self):
+        """
+        Stops accepting clients, finishes the queued writes and shuts the worker threads down.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._writes is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._writes.close)   # Commits queued writes.
+        self._readers.shutdown()
+
+    # ----------- Execution -----------
+    async def _read(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._readers, function, *args)
+
+    async def _write(self, kind, *args):
+        """
+        Queues a "reserve", "cancel", "hold" or "release" on the group commit queue and waits until it is committed.
+        """
+        async with self._write_slots:   # Waits here when too many writes are in flight.
+            return await asyncio.wrap_future(getattr(self._writes, kind)(*args))
+
+    # ----------- Operations -----------
+    async def _reserve(self, request):
+        booking_id = await self._write("reserve", request["name"], request["passport"], request["seat"],
+                                       request.get("meal", "Standard"),
+                                       request.get("flight", booking_system.DEFAULT_FLIGHT), request.get("hold_id"))
+        if booking_id is None:
+            raise ValueError("This seat is already booked or held.")
+        return {"booking_id": booking_id}
+
+    async def _cancel(self, request):
+        return {"cancelled": await self._write("cancel", request["booking_id"])}
+
+    async def _seat_map(self, request):
+        """
+        Replies with the layout and an occupancy string: one '1' (reserved), 'H' (held) or '0' (free) per seat
+        in row order.
+        """
+        flight = request.get("flight", booking_system.DEFAULT_FLIGHT)
+        seat_map = await self._read(booking_system.get_seat_map, self.db_name, flight, True)
+        return {"flight": flight, "rows": seat_map.layout.rows, "columns": seat_map.layout.columns,
+                "occupancy": seat_map.occupancy()}
+
+    async def _hold(self, request):
+        hold_id = await self._write("hold", request["seat"], request.get("flight", booking_system.DEFAULT_FLIGHT))
+        if hold_id is None:
+            raise ValueError("This seat is already booked or held.")
+        return {"hold_id": hold_id, "seconds": booking_system.SEAT_HOLD_SECONDS}
+
+    async def _release(self, request):
+        return {"released": await self._write("release", request["hold_id"])}
+
+    async def _lookup(self, request):
+        row = await self._read(booking_system.find_booking, request["booking_id"], self.db_name)
+        if row is None:
+            return None
+        return dict(zip(BOOKING_FIELDS, row))
+
+    async def _search(self, request):
+        if "passport" in request:
+            rows = await self._read(booking_system.find_by_passport, request["passport"], self.db_name)
+        else:
+            rows = await self._read(booking_system.search_by_name, request["name"], self.db_name)
+        return [dict(zip(BOOKING_FIELDS, row)) for row in rows]
+
+    async def _metrics(self, request):
+        return metrics.snapshot()
+
+    async def handle_request(self, request):
+        """
+        Runs one decoded request and returns the reply object.
+        """
+        reply = {"tag": request["tag"]} if isinstance(request, dict) and "tag" in request else {}
+        if not isinstance(request, dict) or request.get("op") not in self._operations:
+            reply.update(ok=False, error=f"Unknown operation, expected one of {', '.join(self._operations)}.")
+            return reply
+        try:
+            reply.update(ok=True, result=await self._operations[request["op"]](request))
+        except KeyError as e:
+            reply.update(ok=False, error=f"Missing field: {e.args[0]}")
+        except Exception as e:
+            reply.update(ok=False, error=str(e))
+        return reply
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    reply = {"ok": False, "error": "Invalid JSON."}
+                else:
+                    reply = await self.handle_request(request)
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass   # Client went away.
+        finally:
+            writer.close()
+
+async def serve(db_name=booking_system.DEFAULT_DB, host="127.0.0.1", port=8765, path=None, cache_ttl=None):
+    """
+    Runs a BookingServer, with the seat availability cache enabled, until it is interrupted.
+    Give cache_ttl (seconds) when other processes write to the same database file.
+    """
+    booking_system.enable_seat_cache(ttl=cache_ttl)
+    server = BookingServer(db_name)
+    listener = await server.start(host, port, path)
+    print("Apache Airlines booking server listening on", path or listener.sockets[0].getsockname())
+    try:
+        await listener.serve_forever()
+    finally:
+        await server.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apache Airlines booking server")
+    parser.add_argument("--db", default=booking_system.DEFAULT_DB, help="database file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--cache-ttl", type=float, metavar="SECONDS",
+                        help="expire cached seat statuses, for databases shared with other processes")
+    parser.add_argument("--metrics", action="store_true", help="record latency histograms and counters")
+    args = parser.parse_args()
+    if args.metrics:
+        metrics.enable()
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.unix, args.cache_ttl))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,186 @@
+# Apache Airlines - Sharded Booking Store
+# Description: Spreads bookings over several database files, one per shard, chosen by hashing the flight number.
+# Each shard has its own worker process that makes all of that shard's writes, so reservations on flights
+# in different shards take different SQLite write locks and run in parallel on different cores.
+#
+#   with ShardedBookingStore("airlines.db", shards=4) as store:   # airlines-shard0.db ... airlines-shard3.db
+#       store.add_flight("BA123", 30, "ABCDEF")
+#       booking_id = store.reserve("Ann", "P1", "12C", "Halal", "BA123")
+#       store.cancel(booking_id)   # The booking number says which shard holds it
+
+import heapq # Import the sorted merge module
+import itertools # Import the iterator helpers
+import multiprocessing # Import the process start method module
+import os # Import the file path module
+import zlib # Import the CRC32 checksum used as a stable hash
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor # Import the worker executors
+
+import booking_system # Import the booking functions run on each shard
+
+def shard_path(db_name, shard):
+    """
+    Returns the database file of one shard: airlines.db -> airlines-shard0.db, airlines-shard1.db, ...
+    """
+    stem, ext = os.path.splitext(db_name)
+    return f"{stem}-shard{shard}{ext}"
+
+def shard_for_flight(flight, shards):
+    """
+    Returns the shard that holds a flight. CRC32 is used because Python's hash() of a string changes between runs.
+    """
+    return zlib.crc32(flight.strip().upper().encode()) % shards
+
+class ShardedBookingStore:
+    """
+    Routes the booking_system functions to per-flight shards.
+    Writes run on the shard's own worker (a process, or a thread with processes=False); reads open the shard
+    file directly, which SQLite allows alongside the worker's writes. Each shard numbers its bookings from its
+    own slice of the booking number space, so numbers never clash and find their shard again.
+    The writes happen in other processes, so only enable the seat availability cache here with a ttl.
+    """
+
+    def __init__(self, db_name=booking_system.DEFAULT_DB, shards=4, processes=True):
+        if shards < 1:
+            raise ValueError("A sharded store needs at least one shard.")
+        self.db_name = db_name
+        self.shards = shards
+        self.paths = [shard_path(db_name, shard) for shard in range(shards)]
+        self._span = booking_system.ID_SPACE // shards   # Booking number sequences owned by each shard.
+        for shard, path in enumerate(self.paths):
+            self._initialise_shard(shard, path)
+        if processes:
+            context = multiprocessing.get_context("spawn")   # Never fork a process holding open connections.
+            self._workers = [ProcessPoolExecutor(1, mp_context=context) for _ in self.paths]
+        else:
+            self._workers = [ThreadPoolExecutor(1, thread_name_prefix=f"shard{shard}") for shard in range(shards)]
+
+    def _initialise_shard(self, shard, path):
+        """
+        Creates or upgrades a shard's schema, records its place in the store and starts its booking numbers
+        at the beginning of its slice. Raises ValueError if the file belongs to a store with another shard count.
+        """
+        booking_system.initial_database(path)
+        with booking_system.get_pool(path).connection() as conn, booking_system.transaction(conn):
+            conn.execute("CREATE TABLE IF NOT EXISTS shard_info(shard INTEGER NOT NULL, shards INTEGER NOT NULL)")
+            recorded = conn.execute("SELECT shard, shards FROM shard_info").fetchone()
+            if recorded is None:
+                conn.execute("INSERT INTO shard_info VALUES (?, ?)", (shard, self.shards))
+            elif recorded != (shard, self.shards):
+                raise ValueError(f"{path} is shard {recorded[0]} of {recorded[1]}, not {shard} of {self.shards}.")
+            conn.execute("UPDATE id_sequence SET next_value = max(next_value, ?) WHERE name = 'bookings'",
+                         (shard * self._span,))
+
+    def close(self):
+        """
+        Waits for queued writes, stops the workers and closes this process's connections to the shards.
+        """
+        for worker in self._workers:
+            worker.shutdown()
+        for path in self.paths:
+            booking_system.close_pool(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # ----------- Routing -----------
+    def shard_of(self, flight):
+        return shard_for_flight(flight, self.shards)
+
+    def path_of(self, flight):
+        return self.paths[self.shard_of(flight)]
+
+    def _shard_of_booking(self, booking_id):
+        """
+        Returns the shard whose slice a booking number was allocated from, or None for numbers made before
+        sharding (or malformed ones), which have to be looked for on every shard.
+        """
+        try:
+            shard = booking_system.decode_booking_id(booking_id) // self._span
+        except ValueError:
+            return None
+        return shard if shard < self.shards else None
+
+    def _candidates(self, booking_id):
+        home = self._shard_of_booking(booking_id)
+        return [home] if home is not None else range(self.shards)
+
+    def submit(self, shard_key, function, *args, **kwargs):
+        """
+        Runs function(*args, **kwargs, db_name=<shard of the flight shard_key>) on that shard's worker and
+        returns a Future. function must be importable by the worker, e.g. a booking_system function.
+        """
+        shard = self.shard_of(shard_key)
+        return self._workers[shard].submit(function, *args, db_name=self.paths[shard], **kwargs)
+
+    # ----------- Writes (on the shard workers) -----------
+    def add_flight(self, flight, rows, columns):
+        return self.submit(flight, booking_system.add_flight, flight, rows, columns).result()
+
+    def submit_reserve(self, name, passport, seat, meal, flight=booking_system.DEFAULT_FLIGHT):
+        """
+        Queues a reservation on the flight's shard; the Future resolves to the booking number or None.
+        """
+        return self.submit(flight, booking_system.reserve, name, passport, seat, meal, flight=flight)
+
+    def reserve(self, name, passport, seat, meal, flight=booking_system.DEFAULT_FLIGHT):
+        return self.submit_reserve(name, passport, seat, meal, flight).result()
+
+    def reserve_many(self, bookings, flight=booking_system.DEFAULT_FLIGHT, hold_ids=()):
+        return self.submit(flight, booking_system.reserve_many, list(bookings), flight=flight,
+                           hold_ids=list(hold_ids)).result()
+
+    def cancel(self, booking_id):
+        for shard in self._candidates(booking_id):
+            if self._workers[shard].submit(booking_system.cancel, booking_id, self.paths[shard]).result():
+                return True
+        return False
+
+    # ----------- Reads (in this process) -----------
+    def is_seat_reserved(self, seat, flight=booking_system.DEFAULT_FLIGHT):
+        return booking_system.is_seat_reserved(seat, self.path_of(flight), flight)
+
+    def get_seat_map(self, flight=booking_system.DEFAULT_FLIGHT):
+        return booking_system.get_seat_map(self.path_of(flight), flight)
+
+    def get_flight_layout(self, flight=booking_system.DEFAULT_FLIGHT):
+        return booking_system.get_flight_layout(flight, self.path_of(flight))
+
+    def list_flights(self):
+        """
+        Returns (flight, rows, columns) for every flight of every shard, ordered by flight number.
+        """
+        flights = []
+        for shard, path in enumerate(self.paths):   # Every shard file also holds the default flight; keep its home's.
+            flights += [row for row in booking_system.list_flights(path) if self.shard_of(row[0]) == shard]
+        return sorted(flights)
+
+    def find_booking(self, booking_id):
+        for shard in self._candidates(booking_id):
+            row = booking_system.find_booking(booking_id, self.paths[shard])
+            if row is not None:
+                return row
+        return None
+
+    def find_by_passport(self, passport):
+        return [row for path in self.paths for row in booking_system.find_by_passport(passport, path)]
+
+    def search_by_name(self, prefix, limit=booking_system.MANIFEST_PAGE_SIZE):
+        rows = heapq.merge(*(booking_system.search_by_name(prefix, path, limit) for path in self.paths),
+                           key=lambda booking: booking.name.strip().lower())
+        return list(itertools.islice(rows, limit))
+
+    def iter_bookings(self, flight=None, seat_rows=None, meal=None, order_by="booked",
+                      chunk_size=booking_system.MANIFEST_CHUNK_SIZE):
+        """
+        Streams the manifest of every shard, or of the flight's shard only when flight is given.
+        "id" and "seat" orders are merged across shards; "booked" lists one shard after another.
+        """
+        paths = [self.path_of(flight)] if flight is not None else self.paths
+        streams = [booking_system.iter_bookings(path, flight, seat_rows, meal, order_by, chunk_size) for path in paths]
+        if order_by == "booked":
+            return itertools.chain(*streams)
+        key = (lambda booking: booking.id) if order_by == "id" else (lambda booking: (booking.flight, booking.seat))
+        return heapq.merge(*streams, key=key)
@@ -3,21 +3,247 @@
 # Description: Adds a new function (meal preference selection)
 
 import sqlite3 # Import SQLite Database Module
-import random # Import the Generate Random Numbers module
+import sys # Import the string interning function
+import heapq # Import the min-heap used to schedule hold expiry
 import string # Import the string processing module
+import os # Import the file path module
+import queue # Import the thread-safe queue module
+import threading # Import the threading module
+import atexit # Import the interpreter exit hook module
+import json # Import the JSON module
+import time # Import the timing module
+
+from booking_metrics import metrics, instrumented # Import the latency and counter instrumentation
+from contextlib import contextmanager # Import the context manager decorator
+from functools import lru_cache # Import the memoisation decorator
+from collections import OrderedDict # Import the ordered dictionary used for LRU eviction
+
+DEFAULT_DB = "airlines.db"   # Database file used by the booking system.
+POOL_SIZE = 4   # Maximum number of open connections kept per database file.
+BUSY_TIMEOUT_MS = 5000   # How long a connection waits for a lock before failing.
+ID_BLOCK_SIZE = 1000   # Booking numbers reserved from the database in one go.
+GROUP_COMMIT_BATCH = 256   # Most reservations and cancellations committed together.
+GROUP_COMMIT_DELAY = 0.002   # Seconds a write may wait for others to share its commit.
+SEAT_CACHE_SIZE = 100_000   # Seat statuses and seat maps kept by the availability cache.
+SEAT_CACHE_TTL = 5.0   # Seconds the CLI trusts a cached seat status, as other terminals may be booking.
+MANIFEST_CHUNK_SIZE = 500   # Bookings fetched per query when streaming a manifest.
+MANIFEST_PAGE_SIZE = 20   # Bookings printed per screen by show_booking_info().
+SEAT_HOLD_SECONDS = 300   # How long a seat stays held for a customer who is still typing in their details.
+SWEEP_RETRY_DELAY = 0.5   # Seconds before the hold sweeper retries a failed delete; doubled up to SWEEP_RETRY_MAX.
+SWEEP_RETRY_MAX = 30.0   # Longest wait between retries while, e.g., a long import holds the write lock.
+DEFAULT_FLIGHT = "AA001"   # Flight used when none is given.
+MEALS = ("Standard", "Vegetarian", "Halal", "No Meal")   # Meal preferences; a meal's code is its position.
+SEAT_ROWS = 10   # Number of seat rows on the default aircraft.
+SEAT_COLUMNS = "A"   # Seat letters in each row of the default aircraft.
+
+# ----------- Connection Pool -----------
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection that remembers which instrumentation callbacks it carries (see booking_metrics).
+    """
+    hook_version = 0
+
+def _hook(conn):
+    """
+    Brings a connection's trace and progress callbacks up to date after metrics were switched on or off.
+    """
+    if conn.hook_version != metrics.hook_version:
+        metrics.hook(conn)
+
+def open_connection(db_name=DEFAULT_DB):
+    """
+    Opens a new connection configured like every pooled one (WAL journal, pragmas), for threads that keep
+    a connection of their own. Autocommit mode is used so that transactions are started with transaction().
+    """
+    if metrics.enabled:
+        metrics.count("connections_opened")
+    conn = sqlite3.connect(db_name, isolation_level=None, check_same_thread=False,
+                           timeout=BUSY_TIMEOUT_MS / 1000, factory=PooledConnection)
+    conn.execute("PRAGMA journal_mode=WAL")   # Readers do not block the writer.
+    conn.execute("PRAGMA synchronous=NORMAL")   # Safe with WAL, avoids an fsync per commit.
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")   # Wait for locks instead of failing.
+    conn.execute("PRAGMA temp_store=MEMORY")   # Keep temporary tables out of the disk.
+    return conn
+
+class ConnectionPool:
+    """
+    Keeps a bounded set of open SQLite connections for one database file.
+    Connections are configured once when opened (WAL journal, pragmas) and then reused.
+    """
+
+    def __init__(self, db_name, max_size=POOL_SIZE):
+        self.db_name = db_name   # Database file served by this pool.
+        self.max_size = max_size   # Upper bound on open connections.
+        self._idle = queue.LifoQueue()   # Idle connections, most recently used first.
+        self._opened = 0   # Number of connections currently open.
+        self._lock = threading.Lock()   # Protects the open counter.
+        self._closed = False
+
+    def acquire(self, timeout=None):
+        """
+        Borrows a connection, opening a new one if the pool has not reached max_size.
+        Blocks until a connection is returned when all of them are in use.
+        """
+        if self._closed:
+            raise RuntimeError(f"Connection pool for {self.db_name} is closed.")
+        try:
+            return self._idle.get_nowait()   # Reuse an idle connection if there is one.
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = self._opened < self.max_size
+            if can_open:
+                self._opened += 1   # Reserve the slot before opening outside the lock.
+        if can_open:
+            try:
+                return open_connection(self.db_name)
+            except Exception:
+                with self._lock:
+                    self._opened -= 1   # Give the slot back if opening failed.
+                raise
+        try:
+            return self._idle.get(timeout=timeout)   # Wait for another caller to release one.
+        except queue.Empty:
+            raise TimeoutError(f"No database connection available for {self.db_name}.") from None
+
+    def release(self, conn):
+        """
+        Returns a borrowed connection to the pool.
+        Any transaction left open by the caller is rolled back first.
+        """
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+
+    def _discard(self, conn):
+        conn.close()
+        with self._lock:
+            self._opened -= 1
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager that borrows a connection and always gives it back.
+        """
+        if metrics.enabled:
+            start = time.perf_counter()
+            conn = self.acquire()
+            metrics.observe("connection_acquire", time.perf_counter() - start)
+        else:
+            conn = self.acquire()
+        _hook(conn)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """
+        Closes every idle connection; connections still in use are closed when released.
+        """
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+_pools = {}   # One pool per database file, keyed by absolute path.
+_pools_lock = threading.Lock()
+
+def get_pool(db_name=DEFAULT_DB):
+    """
+    Returns the shared connection pool for a database file, creating it on first use.
+    """
+    key = os.path.abspath(db_name)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(db_name)
+    return pool
+
+def close_pool(db_name=DEFAULT_DB):
+    """
+    Closes and forgets the pool for a database file (e.g. before the file is deleted).
+    """
+    with _pools_lock:
+        pool = _pools.pop(os.path.abspath(db_name), None)
+        _forget_database(os.path.abspath(db_name))   # Allocators and layouts belong to this file.
+    if pool is not None:
+        pool.close()
+
+def close_all_pools():
+    """
+    Closes every pool that has been opened by this process.
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        for key in list(_pools):   # Everything cached per file, like close_pool, so a reopened file starts fresh.
+            _forget_database(key)
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+def _forget_database(key):
+    """
+    Drops everything cached for one database file. Called with _pools_lock held.
+    """
+    _id_allocators.pop(key, None)
+    if seat_cache is not None:
+        seat_cache.forget_database(key)
+    for cached in [cached for cached in _flight_layouts if cached[0] == key]:
+        del _flight_layouts[cached]
+    _meal_tables.pop(key, None)
+    _schema_checked.discard(key)
+    sweeper = _hold_sweepers.pop(key, None)
+    if sweeper is not None:
+        sweeper.close()
+
+atexit.register(close_all_pools)   # Make sure connections are closed when the program exits.
+
+@contextmanager
+def transaction(conn, mode="IMMEDIATE"):
+    """
+    Runs a block inside an explicit transaction on a pooled connection.
+    Commits if the block succeeds and rolls back if it raises.
+    """
+    conn.execute(f"BEGIN {mode}")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        if metrics.enabled:
+            metrics.count("rollbacks")
+        raise
+    if metrics.enabled:
+        start = time.perf_counter()
+        conn.execute("COMMIT")
+        metrics.observe("commit", time.perf_counter() - start)
+        metrics.count("commits")
+    else:
+        conn.execute("COMMIT")
 
 # ----------- database initialization -----------
-def initial_database(db_name="airlines.db"):
+# Lower-case, trimmed passenger name used for name searches. SQLite computes it from name on every insert
+# and update, so no code path (or outside tool) writing bookings can leave it stale.
+NAME_KEY_COLUMN = "name_key TEXT GENERATED ALWAYS AS (lower(trim(name))) VIRTUAL"
+
+def _booking_columns(conn):
+    return {row[1] for row in conn.execute("PRAGMA table_xinfo(bookings)")}   # xinfo also lists generated columns
+
+# ----------- Migrations -----------
+# Each migration upgrades the schema by one version inside the caller's transaction. They also work on databases
+# made before versioning existed, which already have some of their changes, so every step checks before it adds.
+def _create_bookings(conn):
     """
-    Initialise the database: create the bookings table to store passenger booking information.
-    If the database or table does not exist, it will be created automatically.
+    Version 1: the bookings table of the first release.
     """
-    # Create the bookings table to store booking information.
-    conn = sqlite3.connect(db_name)   # Connect to (or create) the SQLite database file
-    cursor = conn.cursor()   # Create a cursor object to execute SQL commands
-    
-    # Execute SQL to create the 'bookings' table with fields for id, name, passport, seat, and meal preference
-    cursor.execute('''
+    conn.execute('''
                    CREATE TABLE IF NOT EXISTS bookings(
                        id TEXT PRIMARY KEY,
                        name TEXT NOT NULL,
@@ -26,64 +252,960 @@ def initial_database(db_name="airlines.db"):
                        meal TEXT
                        )
                    ''')
-    conn.commit()   # Save changes.
-    conn.close()   # Close the database connection.
+
+def _add_flights(conn):
+    """
+    Version 2: flights flown by aircraft with their own seat layouts, and one booking per seat per flight.
+    """
+    if "flight" not in _booking_columns(conn):   # Bookings made before flights existed are on the default flight.
+        conn.execute(f"ALTER TABLE bookings ADD COLUMN flight TEXT NOT NULL DEFAULT '{DEFAULT_FLIGHT}'")
+    conn.execute("CREATE TABLE IF NOT EXISTS seat_layouts("
+                 "layout_id TEXT PRIMARY KEY, seat_rows INTEGER NOT NULL, seat_columns TEXT NOT NULL)")
+    conn.execute("CREATE TABLE IF NOT EXISTS flights("
+                 "flight_id TEXT PRIMARY KEY, layout_id TEXT NOT NULL REFERENCES seat_layouts(layout_id))")
+    conn.execute("INSERT OR IGNORE INTO seat_layouts VALUES ('DEFAULT', ?, ?)", (SEAT_ROWS, SEAT_COLUMNS))
+    conn.execute("INSERT OR IGNORE INTO flights VALUES (?, 'DEFAULT')", (DEFAULT_FLIGHT,))
+    # Makes seat lookups an index search and lets reserve() rely on the constraint.
+    # Fails with IntegrityError if an older database already holds two bookings for the same seat.
+    conn.execute("DROP INDEX IF EXISTS idx_bookings_seat")   # Replaced by the per-flight index.
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_bookings_flight_seat ON bookings(flight, seat)")
+
+def _add_id_sequence(conn):
+    """
+    Version 3: the counter booking numbers are allocated from, in blocks (see BookingIdAllocator).
+    """
+    conn.execute("CREATE TABLE IF NOT EXISTS id_sequence(name TEXT PRIMARY KEY, next_value INTEGER NOT NULL)")
+    conn.execute("INSERT OR IGNORE INTO id_sequence (name, next_value) VALUES ('bookings', 0)")
+
+def _add_passenger_search(conn):
+    """
+    Version 4: indexes for finding bookings by exact passport number and by name prefix.
+    """
+    if "name_key" not in _booking_columns(conn):   # Building the index below fills it in for existing bookings.
+        conn.execute(f"ALTER TABLE bookings ADD COLUMN {NAME_KEY_COLUMN}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_passport ON bookings(passport)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_name_key ON bookings(name_key)")
+
+def _add_meal_codes(conn):
+    """
+    Version 5: meal preferences stored as small codes, with the labels kept once in the meals table.
+    """
+    conn.execute("CREATE TABLE IF NOT EXISTS meals(code INTEGER PRIMARY KEY, label TEXT NOT NULL UNIQUE)")
+    conn.executemany("INSERT OR IGNORE INTO meals VALUES (?, ?)", enumerate(MEALS))
+    if "meal" in _booking_columns(conn):   # Free-text meals from older databases get codes of their own.
+        conn.execute("INSERT OR IGNORE INTO meals (label) SELECT DISTINCT meal FROM bookings WHERE meal IS NOT NULL")
+        conn.execute("ALTER TABLE bookings ADD COLUMN meal_code INTEGER REFERENCES meals(code)")
+        conn.execute("UPDATE bookings SET meal_code = (SELECT code FROM meals WHERE label = bookings.meal)")
+        conn.execute("ALTER TABLE bookings DROP COLUMN meal")
+
+def _add_seat_holds(conn):
+    """
+    Version 6: short-lived holds on seats that are being booked (see hold_seat); expires is a time.time() value.
+    """
+    conn.execute("CREATE TABLE IF NOT EXISTS seat_holds(flight TEXT NOT NULL, seat TEXT NOT NULL, "
+                 "hold_id TEXT NOT NULL UNIQUE, expires REAL NOT NULL, PRIMARY KEY (flight, seat))")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_seat_holds_expires ON seat_holds(expires)")
+
+MIGRATIONS = (_create_bookings, _add_flights, _add_id_sequence, _add_passenger_search, _add_meal_codes,
+              _add_seat_holds)   # MIGRATIONS[n] upgrades a database from schema version n to n + 1.
+SCHEMA_VERSION = len(MIGRATIONS)   # Version of the schema this code reads and writes.
+
+_schema_checked = set()   # Absolute paths of the databases this process has already brought up to date.
+
+def schema_version(conn):
+    """
+    Returns the schema version of a database, 0 if it is new or was created before schema versioning.
+    """
+    try:
+        return conn.execute("SELECT max(version) FROM schema_version").fetchone()[0] or 0
+    except sqlite3.OperationalError:   # No schema_version table yet.
+        return 0
+
+@instrumented("initial_database")
+def initial_database(db_name=DEFAULT_DB):
+    """
+    Initialise the database: creates it, or upgrades it, by running the migrations it has not had yet.
+    An up-to-date database costs one version query, and nothing at all once this process has checked it.
+    """
+    key = os.path.abspath(db_name)
+    if key in _schema_checked:
+        return
+    with get_pool(db_name).connection() as conn:   # Borrow a connection to (or create) the SQLite database file
+        version = schema_version(conn)
+        if version < SCHEMA_VERSION:
+            with transaction(conn):   # All pending migrations or none of them.
+                version = schema_version(conn)   # Another process may have upgraded it while we waited for the lock.
+                conn.execute("CREATE TABLE IF NOT EXISTS schema_version(version INTEGER PRIMARY KEY, applied REAL NOT NULL)")
+                for number in range(version, SCHEMA_VERSION):
+                    MIGRATIONS[number](conn)
+                    conn.execute("INSERT INTO schema_version VALUES (?, ?)", (number + 1, time.time()))
+        elif version > SCHEMA_VERSION:
+            raise RuntimeError(f"{db_name} has schema version {version}, newer than this program's {SCHEMA_VERSION}.")
+    _schema_checked.add(key)
+
+# ----------- Booking Numbers -----------
+ID_LENGTH = 8   # Characters in a booking number.
+ID_ALPHABET = string.digits + string.ascii_uppercase   # Booking numbers are written in base 36.
+ID_SPACE = len(ID_ALPHABET) ** ID_LENGTH   # 36^8 distinct booking numbers.
+ID_MULTIPLIER = 1743541808669   # Coprime with 36, so the scrambling below is a one-to-one mapping.
+ID_OFFSET = 1315051425817   # Keeps the first numbers from looking like 00000000, 00000001, ...
+_ID_PAIRS = [a + b for a in ID_ALPHABET for b in ID_ALPHABET]   # All 1296 two-character chunks.
+_ID_INVERSE = pow(ID_MULTIPLIER, -1, ID_SPACE)   # Undoes the multiplication in encode_booking_id().
+_ID_CHARACTERS = frozenset(ID_ALPHABET)   # int(x, 36) also takes signs, underscores and non-ASCII digits.
+
+def encode_booking_id(sequence):
+    """
+    Turns a sequence number into an 8-character uppercase alphanumeric booking number.
+    Different sequence numbers below ID_SPACE always give different booking numbers.
+    """
+    if not 0 <= sequence < ID_SPACE:
+        raise ValueError("Booking number space is exhausted.")
+    value = (sequence * ID_MULTIPLIER + ID_OFFSET) % ID_SPACE   # Bijective scramble modulo 36^8.
+    value, d = divmod(value, 1296)
+    value, c = divmod(value, 1296)
+    a, b = divmod(value, 1296)
+    return _ID_PAIRS[a] + _ID_PAIRS[b] + _ID_PAIRS[c] + _ID_PAIRS[d]
+
+def decode_booking_id(booking_id):
+    """
+    Inverse of encode_booking_id(): returns the sequence number a booking number was made from.
+    Raises ValueError if booking_id is not 8 characters of ID_ALPHABET (in either case).
+    """
+    booking_id = booking_id.strip()
+    if len(booking_id) != ID_LENGTH or not _ID_CHARACTERS.issuperset(booking_id.upper()):
+        raise ValueError(f"Invalid booking number {booking_id}.")
+    return (int(booking_id, 36) - ID_OFFSET) * _ID_INVERSE % ID_SPACE
+
+class BookingIdAllocator:
+    """
+    Hands out unique booking numbers from blocks of the id_sequence counter reserved in the database.
+    One UPDATE reserves a whole block, so no booking number is ever checked against the table before use.
+    """
+
+    def __init__(self, db_name=DEFAULT_DB, block_size=ID_BLOCK_SIZE):
+        self.db_name = db_name
+        self.block_size = block_size
+        self._next = 0   # Next unused sequence number in the current block.
+        self._end = 0   # End (exclusive) of the current block.
+        self._lock = threading.Lock()   # Several threads may book at once.
+
+    def _reserve_block(self, size):
+        """
+        Moves the shared counter forward by size and returns the first sequence number of the block.
+        Other processes using the same database file get disjoint blocks.
+        """
+        with get_pool(self.db_name).connection() as conn, transaction(conn):
+            (end,) = conn.execute("UPDATE id_sequence SET next_value = next_value + ? WHERE name = 'bookings' "
+                                  "RETURNING next_value", (size,)).fetchone()
+        return end - size
+
+    def next_id(self):
+        """
+        Returns one new booking number.
+        """
+        with self._lock:
+            if self._next >= self._end:
+                self._next = self._reserve_block(self.block_size)
+                self._end = self._next + self.block_size
+            sequence = self._next
+            self._next += 1
+        return encode_booking_id(sequence)
+
+    def allocate(self, count):
+        """
+        Returns a list of count new booking numbers for bulk inserts.
+        Uses what is left of the current block and reserves the rest in a single UPDATE.
+        """
+        with self._lock:
+            taken = min(count, self._end - self._next)
+            sequences = range(self._next, self._next + taken)
+            self._next += taken
+            missing = count - taken
+            if missing:
+                start = self._reserve_block(missing + self.block_size)   # Refill the block at the same time.
+                sequences = list(sequences) + list(range(start, start + missing))
+                self._next, self._end = start + missing, start + missing + self.block_size
+        return [encode_booking_id(sequence) for sequence in sequences]
+
+    def advance_past(self, sequence):
+        """
+        Makes sure no number up to sequence is handed out any more, e.g. after booking numbers were imported.
+        """
+        with self._lock:
+            with get_pool(self.db_name).connection() as conn, transaction(conn):
+                conn.execute("UPDATE id_sequence SET next_value = max(next_value, ?) WHERE name = 'bookings'",
+                             (sequence + 1,))
+            if self._next <= sequence:
+                self._next = self._end = 0   # The rest of the block may overlap; take a new one next time.
+
+_id_allocators = {}   # One allocator per database file, keyed by absolute path.
+
+def get_id_allocator(db_name=DEFAULT_DB):
+    """
+    Returns the shared booking number allocator for a database file, creating it on first use.
+    """
+    key = os.path.abspath(db_name)
+    allocator = _id_allocators.get(key)
+    if allocator is None:
+        with _pools_lock:
+            allocator = _id_allocators.setdefault(key, BookingIdAllocator(db_name))
+    return allocator
+
+# ----------- Flights and Seat Layouts -----------
+class SeatLayout:
+    """
+    Seat rows and column letters of an aircraft, with the set of valid seats precomputed.
+    Layouts are shared through seat_layout(), so validating a seat is a single frozenset lookup.
+    """
+
+    def __init__(self, rows, columns):
+        self.rows = rows   # Rows are numbered 1 to rows.
+        self.columns = columns   # Seat letters, e.g. "ABCDEF".
+        self.width = len(columns)   # Seats per row.
+        self.size = rows * self.width   # Seats on the aircraft.
+        self._column_index = {letter: i for i, letter in enumerate(columns)}   # Letter -> column offset.
+        self.seats = frozenset(f"{row}{letter}" for row in range(1, rows + 1) for letter in columns)
+
+    def is_valid(self, seat):
+        return seat in self.seats
+
+    def index(self, seat):
+        """
+        Converts a seat such as '12C' into its position in row order, or None if it is not on the aircraft.
+        """
+        if seat not in self.seats:
+            return None
+        return (int(seat[:-1]) - 1) * self.width + self._column_index[seat[-1]]
+
+    def seat_at(self, index):
+        row, column = divmod(index, self.width)
+        return f"{row + 1}{self.columns[column]}"
+
+    def describe(self):
+        return f"1{self.columns[0]} - {self.rows}{self.columns[-1]}"
+
+@lru_cache(maxsize=None)
+def seat_layout(rows, columns):
+    """
+    Returns the shared SeatLayout for a rows x columns aircraft.
+    """
+    return SeatLayout(rows, columns)
+
+DEFAULT_LAYOUT = seat_layout(SEAT_ROWS, SEAT_COLUMNS)   # 1A to 10A.
+
+_flight_layouts = {}   # (absolute database path, flight) -> SeatLayout.
+
+def get_flight_layout(flight=DEFAULT_FLIGHT, db_name=DEFAULT_DB):
+    """
+    Returns the seat layout of a flight, loading it from the database on first use.
+    Raises ValueError for an unknown flight. Flight numbers are matched in upper case, as add_flight() stores them.
+    """
+    flight = flight.strip().upper()
+    key = (os.path.abspath(db_name), flight)
+    layout = _flight_layouts.get(key)
+    if layout is None:
+        with get_pool(db_name).connection() as conn:
+            row = conn.execute("SELECT l.seat_rows, l.seat_columns FROM flights f "
+                               "JOIN seat_layouts l ON l.layout_id = f.layout_id WHERE f.flight_id = ?",
+                               (flight,)).fetchone()
+        if row is None:
+            raise ValueError(f"Unknown flight {flight}.")
+        layout = _flight_layouts[key] = seat_layout(*row)
+    return layout
+
+def add_flight(flight, rows, columns, db_name=DEFAULT_DB):
+    """
+    Adds a flight flown by an aircraft with the given number of rows and seat letters (e.g. 30, "ABCDEF").
+    Flights with the same layout share one seat_layouts record.
+    """
+    flight, columns = flight.strip().upper(), columns.strip().upper()
+    if not flight or rows < 1 or not columns.isalpha() or len(set(columns)) != len(columns):
+        raise ValueError("A flight needs a number, at least one row and distinct seat letters.")
+    layout_id = f"{rows}x{columns}"
+    with get_pool(db_name).connection() as conn, transaction(conn):
+        conn.execute("INSERT OR IGNORE INTO seat_layouts VALUES (?, ?, ?)", (layout_id, rows, columns))
+        try:
+            conn.execute("INSERT INTO flights VALUES (?, ?)", (flight, layout_id))
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Flight {flight} already exists.") from None
+    return flight
+
+def list_flights(db_name=DEFAULT_DB):
+    """
+    Returns (flight, rows, columns) for every flight, ordered by flight number.
+    """
+    with get_pool(db_name).connection() as conn:
+        return conn.execute("SELECT f.flight_id, l.seat_rows, l.seat_columns FROM flights f "
+                            "JOIN seat_layouts l ON l.layout_id = f.layout_id ORDER BY f.flight_id").fetchall()
+
+# ----------- Booking Records -----------
+class Booking:
+    """
+    One booking. Slotted, so a million of them in a manifest cost no per-record dictionary,
+    and the meal is one of a few shared label strings rather than a new string per row.
+    """
+    __slots__ = ("id", "name", "passport", "seat", "meal", "flight")
+
+    def __init__(self, id, name, passport, seat, meal, flight=DEFAULT_FLIGHT):
+        self.id = id
+        self.name = name
+        self.passport = passport
+        self.seat = seat
+        self.meal = meal
+        self.flight = flight
+
+    def __iter__(self):   # Allows tuple(booking) and unpacking in field order.
+        return iter((self.id, self.name, self.passport, self.seat, self.meal, self.flight))
+
+    def __eq__(self, other):
+        if not isinstance(other, Booking):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return f"Booking({', '.join(map(repr, self))})"
+
+# Columns read into a Booking, in the order the row factory expects. Queries may select more columns after these.
+BOOKING_COLUMNS = "id, name, passport, seat, meal_code, flight"
+
+_meal_tables = {}   # Absolute database path -> (labels indexed by code, {label: code}).
+
+def _meal_table(db_name):
+    """
+    Returns the meal labels of a database indexed by code, and the code of each label, loading them on first use.
+    The labels are interned, so every Booking with the same meal shares one string.
+    """
+    key = os.path.abspath(db_name)
+    table = _meal_tables.get(key)
+    if table is None:
+        with get_pool(db_name).connection() as conn:
+            rows = conn.execute("SELECT code, label FROM meals").fetchall()
+        labels = [None] * (max(code for code, _ in rows) + 1)
+        for code, label in rows:
+            labels[code] = sys.intern(label)
+        table = _meal_tables[key] = (tuple(labels), {label: code for code, label in rows})
+    return table
+
+def meal_code(meal, db_name=DEFAULT_DB):
+    """
+    Returns the stored code of a meal preference (None stays None).
+    Raises ValueError for a meal the database does not know.
+    """
+    if meal is None:
+        return None
+    code = _meal_table(db_name)[1].get(meal)
+    if code is None:
+        raise ValueError(f"Unknown meal preference {meal}, expected one of {', '.join(MEALS)}.")
+    return code
+
+def booking_factory(db_name=DEFAULT_DB):
+    """
+    Returns a sqlite3 row factory that turns rows starting with BOOKING_COLUMNS into Booking records,
+    decoding the meal code to its shared label. Records built by one factory also share their seat and
+    flight strings, which repeat across a manifest.
+    """
+    labels = _meal_table(db_name)[0]
+    shared = {}   # Seat or flight string -> the copy every record uses.
+    share = shared.setdefault
+
+    def make_booking(cursor, row):
+        code = row[4]
+        return Booking(row[0], row[1], row[2], share(row[3], row[3]), None if code is None else labels[code],
+                       share(row[5], row[5]))
+    return make_booking
+
+def _select_bookings(conn, make_booking, sql, params=()):
+    """
+    Runs a query whose columns start with BOOKING_COLUMNS and returns a cursor producing Booking records.
+    make_booking comes from booking_factory(), called before borrowing conn: a cold meal table borrows a
+    connection of its own, and a caller waiting for a second connection while holding one can starve the pool.
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = make_booking   # Only this cursor; the pooled connection keeps plain tuples.
+    return cursor.execute(sql, params)
+
+# ----------- Seat Availability Cache -----------
+_MISSING = object()   # Cache miss marker.
+
+class SeatAvailabilityCache:
+    """
+    In-process, read-through cache of seat statuses and seat maps, keyed by (database, flight, seat);
+    a whole seat map is stored under seat None. Bounded to max_entries with least-recently-used eviction.
+    Writes made through this module update it; ttl (seconds) bounds how stale an entry can get when
+    other processes write to the same database file.
+    """
+
+    def __init__(self, max_entries=SEAT_CACHE_SIZE, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0   # Bumped by every write, so a read that raced with a write is not stored.
+        self._entries = OrderedDict()   # key -> (value, expiry time or None), oldest first.
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the cached value, or _MISSING (counted as a miss) if it is absent or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                self._entries.move_to_end(key)   # Most recently used.
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]   # Expired.
+            self.misses += 1
+            return _MISSING
+
+    def put(self, key, value, generation):
+        """
+        Stores a value read from the database, unless a write happened since generation was taken.
+        """
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._store(key, value)
+
+    def _store(self, key, value):
+        self._entries[key] = (value, None if self.ttl is None else time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)   # Evict the least recently used entry.
+            self.evictions += 1
+
+    def seat_changed(self, db_key, flight, seat, reserved):
+        """
+        Records a committed reservation (reserved=True) or cancellation (reserved=False).
+        The seat's status is replaced and a cached seat map for the flight is updated in place.
+        """
+        with self._lock:
+            self.generation += 1
+            seat_map = self._entries.get((db_key, flight, None))
+            if seat_map is not None:
+                seat_map[0].mark_reserved(seat, reserved)
+            if (db_key, flight, seat) in self._entries or len(self._entries) < self.max_entries:
+                self._store((db_key, flight, seat), reserved)
+
+    def forget_database(self, db_key):
+        with self._lock:
+            self.generation += 1
+            for key in [key for key in self._entries if key[0] == db_key]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns the counters used to size the cache: hits, misses, evictions and current entries.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._entries), "max_entries": self.max_entries}
+
+seat_cache = None   # The active SeatAvailabilityCache, or None when caching is off.
+
+def enable_seat_cache(max_entries=SEAT_CACHE_SIZE, ttl=None):
+    """
+    Turns the seat availability cache on for this process and returns it.
+    Leave it off (or set a ttl) when other programs write to the database without going through this module.
+    """
+    global seat_cache
+    seat_cache = SeatAvailabilityCache(max_entries, ttl)
+    return seat_cache
+
+def disable_seat_cache():
+    global seat_cache
+    seat_cache = None
+
+def forget_cached_seats(db_name=DEFAULT_DB):
+    """
+    Drops every cached seat status and seat map of a database, e.g. after a bulk import.
+    """
+    cache = seat_cache
+    if cache is not None:
+        cache.forget_database(os.path.abspath(db_name))
+
+def _seats_changed(db_name, flight, seats, reserved):
+    """
+    Tells the cache (if enabled) that seats on a flight were just reserved or freed.
+    """
+    cache = seat_cache
+    if cache is not None:
+        db_key = os.path.abspath(db_name)
+        for seat in seats:
+            cache.seat_changed(db_key, flight, seat, reserved)
 
 # ----------- Tool Functions -----------
-def generate_booking_id():
+def generate_booking_id(db_name=DEFAULT_DB):
     """
-    Generates an 8-digit random booking number consisting of uppercase letters and numbers.
-    Used to uniquely identify each booking record.
+    Generates an 8-character booking number consisting of uppercase letters and numbers.
+    Used to uniquely identify each booking record; numbers are never reused within a database.
     """
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))   # Return random ID.
+    return get_id_allocator(db_name).next_id()   # Return the next ID from the reserved block.
 
-def is_seat_reserved(seat,db_name="airlines.db"):
+@instrumented("is_seat_reserved")
+def is_seat_reserved(seat,db_name=DEFAULT_DB, flight=DEFAULT_FLIGHT):
     """
-    Checks if the specified seat has been booked.
-    Returns True for booked, False for unavailable.
+    Checks if the specified seat has been booked on a flight.
+    Returns True for booked, False for unavailable. Served from the seat cache when it is enabled.
     """ 
-    conn = sqlite3.connect(db_name)   # Connect to the database.
-    cursor = conn.cursor()   # Create cursor.
-    cursor.execute("SELECT * FROM bookings WHERE seat = ?", (seat.upper(),))   # Search for seat.
-    result = cursor.fetchone()   # Fetch result
-    conn.close()   # Close connection.
+    seat, flight, cache = seat.upper(), flight.strip().upper(), seat_cache
+    if cache is not None:
+        key = (os.path.abspath(db_name), flight, seat)
+        reserved = cache.get(key)
+        if reserved is not _MISSING:
+            return reserved
+        generation = cache.generation
+    with get_pool(db_name).connection() as conn:   # Borrow a pooled connection.
+        cursor = conn.execute("SELECT 1 FROM bookings WHERE flight = ? AND seat = ?",
+                              (flight, seat))   # Search for seat.
+        result = cursor.fetchone()   # Fetch result
+    if cache is not None:
+        cache.put(key, result is not None, generation)
     return result is not None   # Return True if result exists
 
-def is_valid_seat_format(seat):
+# Insert that silently skips the row when the seat is already taken (unique index on flight and seat)
+# or held for someone else. Parameters: id, name, passport, seat, meal code, flight, time.time(), own hold id or None.
+INSERT_BOOKING_SQL = ("INSERT INTO bookings (id, name, passport, seat, meal_code, flight) "
+                      "SELECT ?1, ?2, ?3, ?4, ?5, ?6 WHERE NOT EXISTS (SELECT 1 FROM seat_holds "
+                      "WHERE flight = ?6 AND seat = ?4 AND expires > ?7 AND hold_id IS NOT ?8) "
+                      "ON CONFLICT(flight, seat) DO NOTHING")
+# Takes over an expired hold on the seat, but never a live one or a booked seat. ?4 is the expiry, ?5 the time now.
+HOLD_SEAT_SQL = ("INSERT INTO seat_holds (flight, seat, hold_id, expires) SELECT ?1, ?2, ?3, ?4 "
+                 "WHERE NOT EXISTS (SELECT 1 FROM bookings WHERE flight = ?1 AND seat = ?2) "
+                 "ON CONFLICT(flight, seat) DO UPDATE SET hold_id = excluded.hold_id, "
+                 "expires = excluded.expires WHERE seat_holds.expires <= ?5")
+RELEASE_HOLD_SQL = "DELETE FROM seat_holds WHERE hold_id = ?"
+SEAT_BOOKED_SQL = "SELECT 1 FROM bookings WHERE flight = ? AND seat = ?"
+
+@instrumented("save_booking")
+def save_booking(booking_id, name, passport, seat, meal, db_name=DEFAULT_DB, flight=DEFAULT_FLIGHT, hold_id=None):
     """
-    Checks whether the seat format is valid.
-    only allows 1A to 10A.
+    Saves one booking record to the database in its own transaction, using up the seat's hold if hold_id is given.
+    Returns True if it was saved, False if the seat was already booked or is held for someone else.
     """
-    valid_seats = [f"{i}A" for i in range(1, 11)]   # Create list: ['1A',...,'10A'].
-    return seat in valid_seats   # Return True if seat is in the valid list.
+    seat, flight, code = seat.upper(), flight.strip().upper(), meal_code(meal, db_name)
+    with get_pool(db_name).connection() as conn, transaction(conn):
+        cursor = conn.execute(INSERT_BOOKING_SQL, (booking_id, name, passport, seat, code, flight, time.time(), hold_id))
+        saved = cursor.rowcount == 1   # No row inserted means another booking (or hold) has the seat.
+        if saved and hold_id is not None:
+            conn.execute(RELEASE_HOLD_SQL, (hold_id,))
+        booked = saved or conn.execute(SEAT_BOOKED_SQL, (flight, seat)).fetchone() is not None
+    if booked:
+        _seats_changed(db_name, flight, [seat], True)   # Reserved now, by this booking or an earlier one.
+    return saved
 
-def view_seats():
+@instrumented("reserve")
+def reserve(name, passport, seat, meal, db_name=DEFAULT_DB, flight=DEFAULT_FLIGHT, hold_id=None):
     """
-    Displays the booking status of the first 10 seats (1A to 10A).
-    Use ‘R’ for booked and ‘F’ for free.
+    Atomically reserves a seat: the unique seat index decides the winner, so there is no check-then-insert race.
+    A seat held by someone else counts as taken; pass hold_id to book a seat held with hold_seat().
+    Returns the new booking number, or None if the seat is already booked or held.
+    Raises ValueError for an unknown flight or meal, or a seat that is not on its aircraft.
     """
-    print("\n=== Seat status (1A - 10A) ===")   # Display heading.
-    for row in range(1, 11):   # loop through the number 1 to 10.
-        seat = f"{row}A"   # Create seat number string.
-        status = "R" if is_seat_reserved(seat) else "F"   # Check status.
-        print(f"Seat {seat}: {'Booked' if status == 'R' else 'Free'}")   # Print result.
+    seat, flight = seat.strip().upper(), flight.strip().upper()
+    if not is_valid_seat_format(seat, get_flight_layout(flight, db_name)):
+        raise ValueError(f"Invalid seat number {seat}.")
+    meal_code(meal, db_name)   # Reject an unknown meal before a booking number is used up.
+    for _ in range(3):
+        booking_id = generate_booking_id(db_name)   # Generate unique booking ID.
+        try:
+            return booking_id if save_booking(booking_id, name, passport, seat, meal, db_name, flight, hold_id) else None
+        except sqlite3.IntegrityError:
+            continue   # Only possible against random numbers written before the allocator existed.
+    raise RuntimeError("Could not allocate a free booking number.")
 
+@instrumented("reserve_many")
+def reserve_many(bookings, db_name=DEFAULT_DB, flight=DEFAULT_FLIGHT, hold_ids=()):
+    """
+    Reserves a group of seats on one flight in one transaction. bookings is an iterable of (name, passport, seat, meal).
+    Returns (booking_ids, failures): failures is a list of (position, reason), and if it is not empty
+    nothing was saved, so a group booking is never left half done.
+    hold_ids are the caller's own holds (see hold_seat): their seats can be booked, and they are used up on success.
+    """
+    flight = flight.strip().upper()
+    layout = get_flight_layout(flight, db_name)   # Raises ValueError for an unknown flight.
+    meal_codes = _meal_table(db_name)[1]
+    rows, failures, seen = [], [], {}
+    for position, booking in enumerate(bookings):
+        try:
+            name, passport, seat, meal = booking
+            name, passport, seat = name.strip(), passport.strip(), seat.strip().upper()
+            if meal is not None and not isinstance(meal, str):
+                raise TypeError(meal)
+        except (TypeError, ValueError, AttributeError):   # Wrong number of fields, or a field that is not text.
+            failures.append((position, "Expected name, passport, seat and meal."))
+            continue
+        if not name or not passport:
+            failures.append((position, "Input cannot be empty."))
+        elif not is_valid_seat_format(seat, layout):
+            failures.append((position, f"Invalid seat number {seat}."))
+        elif seat in seen:
+            failures.append((position, f"Seat {seat} is requested twice in this group."))
+        elif meal is not None and meal not in meal_codes:
+            failures.append((position, f"Unknown meal preference {meal}."))
+        seen.setdefault(seat, position)
+        rows.append((name, passport, seat, meal_codes.get(meal), flight))
+    if failures or not rows:
+        return [], failures
 
-def reserve_seat():
+    booking_ids = get_id_allocator(db_name).allocate(len(rows))   # Reserved before taking the write lock.
+    with get_pool(db_name).connection() as conn, transaction(conn):
+        # One set-based query finds every seat of the group that is already booked.
+        taken = conn.execute("SELECT seat FROM bookings WHERE flight = ? AND seat IN (SELECT value FROM json_each(?))",
+                             (flight, json.dumps(list(seen)))).fetchall()
+        if taken:
+            return [], sorted((seen[seat], f"Seat {seat} is already booked.") for (seat,) in taken)
+        own_holds = json.dumps(list(hold_ids))
+        held = conn.execute("SELECT seat FROM seat_holds WHERE flight = ? AND expires > ? "
+                            "AND seat IN (SELECT value FROM json_each(?)) "
+                            "AND hold_id NOT IN (SELECT value FROM json_each(?))",
+                            (flight, time.time(), json.dumps(list(seen)), own_holds)).fetchall()
+        if held:
+            return [], sorted((seen[seat], f"Seat {seat} is held by another booking.") for (seat,) in held)
+        # The write lock is held since BEGIN IMMEDIATE, so no other booker can take a seat meanwhile.
+        conn.executemany("INSERT INTO bookings (id, name, passport, seat, meal_code, flight) VALUES (?, ?, ?, ?, ?, ?)",
+                         ((booking_id, *row) for booking_id, row in zip(booking_ids, rows)))
+        conn.execute("DELETE FROM seat_holds WHERE hold_id IN (SELECT value FROM json_each(?))", (own_holds,))
+    _seats_changed(db_name, flight, seen, True)
+    return booking_ids, []
+
+@instrumented("cancel")
+def cancel(booking_id, db_name=DEFAULT_DB):
+    """
+    Deletes a booking by its booking number.
+    Returns True if a booking was cancelled, False if the number was not found.
     """
-    The user enters his name, passport number and seat number to make a booking.
-    If the seat is available, a reservation number is generated and the information is saved to the database.
+    with get_pool(db_name).connection() as conn, transaction(conn):   # Borrow a connection
+        freed = conn.execute("DELETE FROM bookings WHERE id = ? RETURNING flight, seat",
+                             (booking_id.strip().upper(),)).fetchone()   # Attempt deletion.
+    if freed is not None:
+        _seats_changed(db_name, freed[0], [freed[1]], False)
+    return freed is not None
+
+@instrumented("find_booking")
+def find_booking(booking_id, db_name=DEFAULT_DB):
+    """
+    Looks a booking up by its booking number.
+    Returns a Booking, or None if it does not exist.
+    """
+    make_booking = booking_factory(db_name)
+    with get_pool(db_name).connection() as conn:
+        return _select_bookings(conn, make_booking, f"SELECT {BOOKING_COLUMNS} FROM bookings WHERE id = ?",
+                                (booking_id.strip().upper(),)).fetchone()
+
+@instrumented("find_by_passport")
+def find_by_passport(passport, db_name=DEFAULT_DB):
+    """
+    Finds every booking made with a passport number, in the order they were booked.
+    Returns a list of Booking records, read through the passport index.
+    """
+    make_booking = booking_factory(db_name)
+    with get_pool(db_name).connection() as conn:
+        return _select_bookings(conn, make_booking, f"SELECT {BOOKING_COLUMNS} FROM bookings WHERE passport = ? "
+                                "ORDER BY rowid", (passport.strip(),)).fetchall()
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)   # SQLite's lower() only folds ASCII.
+_PREFIX_END = "\U0010ffff"   # Sorts after every character, so key < prefix + _PREFIX_END ends the prefix range.
+
+@instrumented("search_by_name")
+def search_by_name(prefix, db_name=DEFAULT_DB, limit=MANIFEST_PAGE_SIZE):
+    """
+    Finds bookings whose passenger name starts with prefix, ignoring case and surrounding spaces.
+    Returns up to limit Booking records in name order, found with one index range scan.
+    """
+    key = prefix.strip().translate(_ASCII_LOWER)
+    if not key:
+        raise ValueError("Search text cannot be empty.")
+    make_booking = booking_factory(db_name)
+    with get_pool(db_name).connection() as conn:
+        return _select_bookings(conn, make_booking, f"SELECT {BOOKING_COLUMNS} FROM bookings "
+                                "WHERE name_key >= ? AND name_key < ? ORDER BY name_key, rowid LIMIT ?",
+                                (key, key + _PREFIX_END, limit)).fetchall()
+
+def is_valid_seat_format(seat, layout=DEFAULT_LAYOUT):
+    """
+    Checks whether the seat format is valid for an aircraft layout.
+    The default layout only allows 1A to 10A.
+    """
+    return layout.is_valid(seat)   # Return True if seat is in the layout's precomputed set.
+
+# ----------- Seat Holds -----------
+class SeatHoldSweeper:
+    """
+    Background thread that deletes expired seat holds from one database.
+    Expiry times wait in a min-heap, so the thread sleeps until the earliest hold runs out instead of polling.
+    Expired holds never block a booking even before they are swept: every check compares expires with the clock.
+    """
+
+    def __init__(self, db_name=DEFAULT_DB):
+        self.db_name = db_name
+        self.swept = 0   # Expired holds deleted so far.
+        self._expiries = []   # Min-heap of the expiry times of the holds placed through this process.
+        self._wakeup = threading.Condition()
+        self._stopped = False
+        self._started = False   # The thread is started with the first hold.
+
+    def schedule(self, expires):
+        """
+        Makes sure the thread wakes up at time.time() == expires.
+        """
+        with self._wakeup:
+            heapq.heappush(self._expiries, expires)
+            if self._started or self._stopped:
+                if self._expiries[0] == expires:
+                    self._wakeup.notify()   # New earliest expiry: shorten the current sleep.
+                return
+            self._started = True   # This caller starts the thread.
+        # Opened by the caller, whose hold has just been written, so the thread never recreates a deleted file.
+        # Outside _wakeup, which close() takes with _pools_lock held, and without get_pool(), which takes that lock.
+        try:
+            conn = open_connection(self.db_name)   # Own connection, outside the pool, used only by the thread.
+        except Exception:
+            with self._wakeup:
+                self._started = False   # Let the next hold try again.
+            raise
+        threading.Thread(target=self._run, args=(conn,), name="seat-hold-sweeper", daemon=True).start()
+
+    def close(self):
+        """
+        Stops the thread without waiting for it.
+        """
+        with self._wakeup:
+            self._stopped = True
+            self._wakeup.notify()
+
+    def _run(self, conn):
+        retry = SWEEP_RETRY_DELAY
+        try:
+            while True:
+                with self._wakeup:
+                    while not self._stopped and (not self._expiries or self._expiries[0] > time.time()):
+                        self._wakeup.wait(self._expiries[0] - time.time() if self._expiries else None)
+                    if self._stopped:
+                        return
+                    now = time.time()
+                    while self._expiries and self._expiries[0] <= now:
+                        heapq.heappop(self._expiries)
+                try:
+                    with transaction(conn):   # Also removes expired holds left behind by other processes.
+                        self.swept += conn.execute("DELETE FROM seat_holds WHERE expires <= ?", (now,)).rowcount
+                    retry = SWEEP_RETRY_DELAY
+                except sqlite3.Error:   # E.g. still locked after the busy timeout: try again later, never give up.
+                    with self._wakeup:
+                        heapq.heappush(self._expiries, time.time() + retry)
+                    retry = min(retry * 2, SWEEP_RETRY_MAX)
+        finally:
+            conn.close()
+
+_hold_sweepers = {}   # One sweeper per database file, keyed by absolute path.
+
+def get_hold_sweeper(db_name=DEFAULT_DB):
+    """
+    Returns the seat hold sweeper of a database file, creating it on first use.
+    """
+    key = os.path.abspath(db_name)
+    sweeper = _hold_sweepers.get(key)
+    if sweeper is None:
+        with _pools_lock:
+            sweeper = _hold_sweepers.setdefault(key, SeatHoldSweeper(db_name))
+    return sweeper
+
+@instrumented("hold_seat")
+def hold_seat(seat, db_name=DEFAULT_DB, flight=DEFAULT_FLIGHT, seconds=SEAT_HOLD_SECONDS):
+    """
+    Holds a free seat for seconds, so nobody else can book it while a customer finishes their booking.
+    Returns the hold id to pass to reserve(), or None if the seat is booked or already held.
+    Raises ValueError for an unknown flight or a seat that is not on its aircraft.
+    """
+    seat, flight = seat.strip().upper(), flight.strip().upper()
+    if not is_valid_seat_format(seat, get_flight_layout(flight, db_name)):
+        raise ValueError(f"Invalid seat number {seat}.")
+    hold_id, now = os.urandom(8).hex(), time.time()
+    with get_pool(db_name).connection() as conn, transaction(conn):
+        cursor = conn.execute(HOLD_SEAT_SQL, (flight, seat, hold_id, now + seconds, now))
+    if cursor.rowcount != 1:
+        return None
+    get_hold_sweeper(db_name).schedule(now + seconds)
+    return hold_id
+
+def release_hold(hold_id, db_name=DEFAULT_DB):
+    """
+    Gives a held seat back before its hold expires. Returns True if the hold still existed.
+    """
+    with get_pool(db_name).connection() as conn, transaction(conn):
+        return conn.execute(RELEASE_HOLD_SQL, (hold_id,)).rowcount == 1
+
+def held_seats(db_name=DEFAULT_DB, flight=DEFAULT_FLIGHT):
+    """
+    Returns the set of seats on a flight with a live hold, read from the holds of that flight only.
+    """
+    flight = flight.strip().upper()
+    with get_pool(db_name).connection() as conn:
+        return {seat for (seat,) in conn.execute("SELECT seat FROM seat_holds WHERE flight = ? AND expires > ?",
+                                                 (flight, time.time()))}
+
+def is_seat_available(seat, db_name=DEFAULT_DB, flight=DEFAULT_FLIGHT, hold_id=None):
+    """
+    Returns True if a seat is neither booked nor held; a seat held with hold_id counts as available to its holder.
+    """
+    flight = flight.strip().upper()
+    if is_seat_reserved(seat, db_name, flight):
+        return False
+    with get_pool(db_name).connection() as conn:
+        return conn.execute("SELECT 1 FROM seat_holds WHERE flight = ? AND seat = ? AND expires > ? AND hold_id IS NOT ?",
+                            (flight, seat.strip().upper(), time.time(), hold_id)).fetchone() is None
+
+# ----------- Seat Map -----------
+_OCCUPANCY_DIGITS = bytes.maketrans(b"\x00\x01\x02", b"01H")   # Occupancy byte -> printable character.
+
+class SeatMap:
+    """
+    Occupancy of every seat on the aircraft, one byte per seat indexed by row and column.
+    Built from a single query by get_seat_map(), so checking any seat afterwards costs no query.
+    """
+
+    def __init__(self, layout=DEFAULT_LAYOUT):
+        self.layout = layout   # Rows and seat letters of the aircraft.
+        self._occupied = bytearray(layout.size)   # 1 = reserved, 2 = held, 0 = free, in row order.
+
+    def mark_reserved(self, seat, reserved=True):
+        index = self.layout.index(seat.upper())
+        if index is not None:   # Seats outside the layout are ignored.
+            self._occupied[index] = reserved
+
+    def mark_held(self, seat):
+        index = self.layout.index(seat.upper())
+        if index is not None and self._occupied[index] == 0:   # A booking outranks a hold.
+            self._occupied[index] = 2
+
+    def is_reserved(self, seat):
+        index = self.layout.index(seat.upper())
+        return index is not None and self._occupied[index] == 1
+
+    def is_held(self, seat):
+        index = self.layout.index(seat.upper())
+        return index is not None and self._occupied[index] == 2
+
+    def seats(self):
+        """
+        Yields (seat, reserved) for every seat in row order.
+        """
+        seat_at = self.layout.seat_at
+        for index, reserved in enumerate(self._occupied):
+            yield seat_at(index), reserved == 1
+
+    def copy(self):
+        seat_map = SeatMap(self.layout)
+        seat_map._occupied[:] = self._occupied
+        return seat_map
+
+    def occupancy(self):
+        """
+        Returns the whole map as a string of '1' (reserved), 'H' (held) and '0' (free), one character per seat
+        in row order.
+        """
+        return self._occupied.translate(_OCCUPANCY_DIGITS).decode("ascii")
+
+    def reserved_count(self):
+        return self._occupied.count(1)
+
+    def free_count(self):
+        return self._occupied.count(0)
+
+@instrumented("get_seat_map")
+def get_seat_map(db_name=DEFAULT_DB, flight=DEFAULT_FLIGHT, include_holds=False):
+    """
+    Loads the occupancy of every seat on a flight with one indexed query and returns it as a SeatMap.
+    Served from the seat cache when it is enabled; the caller always gets its own copy.
+    With include_holds, seats with a live hold are marked as held (never cached, as holds expire).
+    """
+    flight = flight.strip().upper()
+    if include_holds:
+        seat_map = get_seat_map(db_name, flight)
+        for seat in held_seats(db_name, flight):
+            seat_map.mark_held(seat)
+        return seat_map
+    cache = seat_cache
+    if cache is not None:
+        key = (os.path.abspath(db_name), flight, None)
+        cached = cache.get(key)
+        if cached is not _MISSING:
+            return cached.copy()
+        generation = cache.generation
+    seat_map = SeatMap(get_flight_layout(flight, db_name))
+    with get_pool(db_name).connection() as conn:   # Borrow a pooled connection.
+        for (seat,) in conn.execute("SELECT seat FROM bookings WHERE flight = ?", (flight,)):   # Every reserved seat at once.
+            seat_map.mark_reserved(seat)
+    if cache is not None:
+        cache.put(key, seat_map.copy(), generation)
+    return seat_map
+
+def ask_flight(db_name=DEFAULT_DB):
+    """
+    Asks the user which flight to work with; pressing Enter picks the default flight.
+    Raises ValueError for an unknown flight.
+    """
+    flights = list_flights(db_name)
+    if len(flights) > 1:
+        print("Flights: " + ", ".join(f"{flight} ({rows} rows, {columns})" for flight, rows, columns in flights))
+    flight = input(f"Please enter the flight number (press Enter for {DEFAULT_FLIGHT}): ").strip().upper()
+    flight = flight or DEFAULT_FLIGHT
+    get_flight_layout(flight, db_name)   # Check that the flight exists.
+    return flight
+
+def view_seats(db_name=DEFAULT_DB, flight=None):
+    """
+    Displays the booking status of every seat on a flight; asks for the flight if none is given.
+    Rendered from a single seat map query rather than one query per seat.
+    """
+    try:
+        flight = flight or ask_flight(db_name)
+    except ValueError as e:
+        print(e)
+        return
+    seat_map = get_seat_map(db_name, flight, include_holds=True)   # One query for the seats, one for the holds.
+    print(f"\n=== Seat status {flight} ({seat_map.layout.describe()}) ===")   # Display heading.
+    for seat, reserved in seat_map.seats():   # loop through every seat in row order.
+        status = 'Booked' if reserved else 'Held' if seat_map.is_held(seat) else 'Free'
+        print(f"Seat {seat}: {status}")   # Print result.
+
+
+def reserve_seat(db_name=DEFAULT_DB, flight=None):
+    """
+    The user enters the flight and seat number, then their name, passport number and meal to make a booking.
+    The seat is held as soon as it is chosen, so nobody can take it while the rest of the details are typed in.
     Basic exception handling is included.
     """
+    hold_id = None
     try:
-        name = input("Please enter your name: ").strip()   # Get name input.
-        passport = input("Please enter your passport number: ").strip()   # Get passport.
+        flight = flight or ask_flight(db_name)   # Get flight number.
+        layout = get_flight_layout(flight, db_name)   # Seats on this flight's aircraft.
         seat = input("Please enter the seat number: ").strip().upper()   # Get seat number and convert to uppercase.
-        
-        # Validate seat format (must be between 1A and 10A)
-        if not is_valid_seat_format(seat):
-            print("Invalid seat number. Please enter a seat between 1A and 10A.")
+
+        # Validate seat format (must be on the flight's aircraft)
+        if not is_valid_seat_format(seat, layout):
+            print(f"Invalid seat number. Please enter a seat between {layout.describe().replace(' - ', ' and ')}.")
+            return
+
+        # Hold the seat while the passenger details are entered
+        hold_id = hold_seat(seat, db_name, flight)
+        if hold_id is None:
+            if is_seat_reserved(seat, db_name, flight):
+                print("This seat is already booked, please select another seat.")
+            else:
+                print("This seat is being booked by another passenger, please select another seat.")
             return
+        print(f"Seat {seat} is held for you for {SEAT_HOLD_SECONDS // 60} minutes.")
+
+        name = input("Please enter your name: ").strip()   # Get name input.
+        passport = input("Please enter your passport number: ").strip()   # Get passport.
 
         # Display meal preference options to user.
         print("Meal Preferences: ")
@@ -92,29 +1214,20 @@ def reserve_seat():
         print("3. Halal")
         print("4. No Meal")
         meal_choice = input("Select your meal preference (1-4): ").strip()   # Get choice.
-        meal_map = {'1':'Standard','2':'Vegetarian','3':'Halal','4':'No Meal'}   # Map input to meal type.
+        meal_map = {str(code + 1): meal for code, meal in enumerate(MEALS)}   # Map input to meal type.
         meal = meal_map.get(meal_choice,'Standard') # default to 'Standard' if invalid input
         
         
         # Check that the inputs are correct
-        if not name or not passport or not seat:
+        if not name or not passport:
             print('Input cannot be empty.')
             return
-        
-        # Determine if a seat is booked
-        if is_seat_reserved(seat):
-            print("This seat is already booked, please select another seat.")
-            return
 
         # Generate booking number and import into database
-        booking_id = generate_booking_id()   # Generate unique booking ID.
-
-        conn = sqlite3.connect("airlines.db")
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO bookings (id, name, passport, seat, meal) VALUES (?, ?, ?, ?, ?)",
-                       (booking_id, name, passport, seat, meal))
-        conn.commit()   # Save changes
-        conn.close()   # Close changes
+        booking_id = reserve(name, passport, seat, meal, db_name, flight, hold_id)   # Uses up the hold; None if it expired and the seat was taken
+        if booking_id is None:
+            print("Your hold on this seat expired and it was booked by someone else, please select another seat.")
+            return
         
         # Display information
         print(f"The booking was successful! Your booking number is: {booking_id}")
@@ -123,9 +1236,12 @@ def reserve_seat():
     except Exception as e:
         # Print any information that may be incorrect
         print("Booking Failure:",e)   
+    finally:
+        if hold_id is not None:
+            release_hold(hold_id, db_name)   # Frees the seat if the booking was not made; no-op once booked.
         
 # Booking cancellation
-def cancel_booking():
+def cancel_booking(db_name=DEFAULT_DB):
     """
     The user enters the reservation number to cancel the reservation.
     If the corresponding record is found, it is deleted from the database.
@@ -136,45 +1252,288 @@ def cancel_booking():
             print("Booking number cannot be empty. Please try again.")
             return
     
-        conn = sqlite3.connect("airlines.db")   # Connect to database
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM bookings WHERE id = ?", (booking_id,))   # Attempt deletion.
-        conn.commit()   # Save changes
-        if cursor.rowcount > 0:
+        if cancel(booking_id, db_name):   # Attempt deletion.
             print("Booking cancelled.")   # Success message
         else:
             print("The corresponding booking number was not found.")   # Not found
-        conn.close()
     except Exception as e:
         print("Failed cancellation:",e)   # Print error
     
 
-def show_booking_info():
+# ----------- Group Commit -----------
+_STOP = object()   # Tells the group commit thread to finish.
+
+class GroupCommitQueue:
     """
-    Displays all current bookings, listing number, name, passport number and seat by row.
+    Collects reservations, cancellations and seat holds from many callers and commits them together,
+    every max_batch operations or max_delay seconds, so one commit (and one fsync) covers many bookings.
+    Each call returns a concurrent.futures.Future that resolves once the commit holding its write is done.
+    """
+
+    def __init__(self, db_name=DEFAULT_DB, max_batch=GROUP_COMMIT_BATCH, max_delay=GROUP_COMMIT_DELAY, durable=True):
+        from concurrent.futures import Future   # Imported here, not at the top: most programs never start a queue.
+        self._future = Future
+        self.db_name = db_name
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.commits = 0   # Transactions committed so far.
+        self.operations = 0   # Writes applied so far.
+        self._pending = queue.SimpleQueue()   # (kind, arguments, future) waiting for the next batch.
+        self._conn = open_connection(db_name)   # Own connection, outside the pool, used only by the thread.
+        if durable:
+            self._conn.execute("PRAGMA synchronous=FULL")   # A resolved future means the write reached the disk.
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def reserve(self, name, passport, seat, meal, flight=DEFAULT_FLIGHT, hold_id=None):
+        """
+        Queues a reservation. The future's result is the booking number, or None if the seat was taken,
+        including by an earlier reservation in the same batch, or is held for someone else.
+        """
+        future = self._future()
+        seat, flight = seat.strip().upper(), flight.strip().upper()
+        try:
+            if not is_valid_seat_format(seat, get_flight_layout(flight, self.db_name)):
+                raise ValueError(f"Invalid seat number {seat}.")
+            code = meal_code(meal, self.db_name)
+        except ValueError as e:
+            future.set_exception(e)
+            return future
+        self._pending.put(("reserve", (name, passport, seat, code, flight, hold_id), future))
+        return future
+
+    def cancel(self, booking_id):
+        """
+        Queues a cancellation. The future's result is True if a booking was deleted.
+        """
+        future = self._future()
+        self._pending.put(("cancel", (booking_id.strip().upper(),), future))
+        return future
+
+    def hold(self, seat, flight=DEFAULT_FLIGHT, seconds=SEAT_HOLD_SECONDS):
+        """
+        Queues a seat hold (see hold_seat). The future's result is the hold id, or None if the seat is booked
+        or already held.
+        """
+        future = self._future()
+        seat, flight = seat.strip().upper(), flight.strip().upper()
+        try:
+            if not is_valid_seat_format(seat, get_flight_layout(flight, self.db_name)):
+                raise ValueError(f"Invalid seat number {seat}.")
+        except ValueError as e:
+            future.set_exception(e)
+            return future
+        self._pending.put(("hold", (flight, seat, os.urandom(8).hex(), seconds), future))
+        return future
+
+    def release(self, hold_id):
+        """
+        Queues the release of a hold. The future's result is True if the hold still existed.
+        """
+        future = self._future()
+        self._pending.put(("release", (hold_id,), future))
+        return future
+
+    def close(self):
+        """
+        Commits everything already queued and stops the thread.
+        """
+        if self._thread.is_alive():
+            self._pending.put(_STOP)
+            self._thread.join()
+            self._conn.close()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._pending.get()   # Sleep until there is something to write.
+            if first is _STOP:
+                break
+            batch, deadline = [first], time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:   # Gather more writes until the batch is full or the delay is up.
+                try:
+                    item = self._pending.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._commit(batch)
+            except Exception as e:   # Never let one batch stop the thread; later batches would wait forever.
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    @instrumented("group_commit")
+    def _commit(self, batch):
+        """
+        Applies a batch in order inside one transaction, then resolves the futures.
+        """
+        results, changes, expiries, now = [], [], [], time.time()
+        try:
+            # Inside the try: a locked id_sequence (e.g. during a long import) fails this batch, not the thread.
+            booking_ids = iter(get_id_allocator(self.db_name).allocate(sum(kind == "reserve" for kind, _, _ in batch)))
+            _hook(self._conn)
+            with transaction(self._conn):
+                for kind, args, _ in batch:
+                    try:
+                        if kind == "reserve":
+                            booking_id, (name, passport, seat, code, flight, hold_id) = next(booking_ids), args
+                            cursor = self._conn.execute(INSERT_BOOKING_SQL, (booking_id, name, passport, seat, code,
+                                                                             flight, now, hold_id))
+                            saved = cursor.rowcount == 1
+                            if saved and hold_id is not None:
+                                self._conn.execute(RELEASE_HOLD_SQL, (hold_id,))
+                            if saved or self._conn.execute(SEAT_BOOKED_SQL, (flight, seat)).fetchone():
+                                changes.append(((flight, seat), True))   # Reserved, by this or an earlier booking.
+                            results.append((booking_id if saved else None, None))   # Seat conflict or hold -> None
+                        elif kind == "hold":
+                            flight, seat, hold_id, seconds = args
+                            held = self._conn.execute(HOLD_SEAT_SQL, (flight, seat, hold_id, now + seconds,
+                                                                      now)).rowcount == 1
+                            if held:
+                                expiries.append(now + seconds)
+                            results.append((hold_id if held else None, None))
+                        elif kind == "release":
+                            results.append((self._conn.execute(RELEASE_HOLD_SQL, args).rowcount == 1, None))
+                        else:
+                            freed = self._conn.execute("DELETE FROM bookings WHERE id = ? RETURNING flight, seat",
+                                                       args).fetchone()
+                            changes.append((freed, False))   # None when the booking did not exist.
+                            results.append((freed is not None, None))
+                    except sqlite3.IntegrityError as e:   # Only this operation failed; the rest still commit.
+                        results.append((None, e))
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)   # Nothing in the batch was saved.
+            return
+        self.commits += 1
+        self.operations += len(batch)
+        for expires in expiries:   # Only committed holds are worth sweeping.
+            get_hold_sweeper(self.db_name).schedule(expires)
+        for flight_seat, reserved in changes:   # Apply to the cache in commit order.
+            if flight_seat is not None:
+                _seats_changed(self.db_name, flight_seat[0], [flight_seat[1]], reserved)
+        for (_, _, future), (result, error) in zip(batch, results):
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+# ----------- Booking Manifest -----------
+# Sort orders for iter_bookings(); each is backed by an index so every page is an index range scan.
+MANIFEST_ORDERS = {
+    "booked": ("rowid",),   # Order in which the bookings were made.
+    "id": ("id",),   # Booking number.
+    "seat": ("flight", "seat"),   # Flight, then seat number as text.
+}
+
+def iter_bookings(db_name=DEFAULT_DB, flight=None, seat_rows=None, meal=None, order_by="booked",
+                  chunk_size=MANIFEST_CHUNK_SIZE):
+    """
+    Streams Booking records, chunk_size rows per query.
+    Optional filters: flight, seat_rows as an inclusive (first, last) row range, and meal.
+    Uses keyset pagination, so memory stays flat and no connection is held between chunks.
+    """
+    if order_by not in MANIFEST_ORDERS:
+        raise ValueError(f"Unknown order {order_by}, expected one of {', '.join(MANIFEST_ORDERS)}.")
+    keys = MANIFEST_ORDERS[order_by]
+    key_list = ", ".join(keys)
+    conditions, params = [], []
+    if flight is not None:
+        conditions.append("flight = ?")
+        params.append(flight.strip().upper())
+    if seat_rows is not None:
+        conditions.append("CAST(seat AS INTEGER) BETWEEN ? AND ?")   # '12C' -> 12.
+        params.extend(seat_rows)
+    if meal is not None:
+        code = _meal_table(db_name)[1].get(meal)
+        if code is None:
+            return   # No booking has a meal the database does not know.
+        conditions.append("meal_code = ?")
+        params.append(code)
+
+    make_booking = booking_factory(db_name)
+    last_row = None   # Raw row behind the last Booking built; its trailing columns hold the sort key.
+
+    def factory(cursor, row):
+        nonlocal last_row
+        last_row = row
+        return make_booking(cursor, row)
+
+    last_key = None   # Sort key of the last row already returned.
+    while True:
+        where, values = list(conditions), list(params)
+        if last_key is not None:
+            where.append(f"({key_list}) > ({', '.join('?' * len(keys))})")   # Continue after the last row.
+            values.extend(last_key)
+        sql = f"SELECT {BOOKING_COLUMNS}, {key_list} FROM bookings"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {key_list} LIMIT ?"
+        with get_pool(db_name).connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = factory
+            bookings = cursor.execute(sql, values + [chunk_size]).fetchall()
+        yield from bookings
+        if len(bookings) < chunk_size:
+            return
+        last_key = last_row[len(Booking.__slots__):]
+
+def show_booking_info(db_name=DEFAULT_DB, flight=None, page_size=MANIFEST_PAGE_SIZE):
+    """
+    Displays current bookings page by page, listing number, name, passport number, flight and seat by row.
+    Asks for an optional flight filter when none is given; rows are streamed, never loaded all at once.
     """
     try:
-        conn = sqlite3.connect("airlines.db")   # Connect to database.
-        cursor = conn.cursor()   # Create cursor
-        cursor.execute("SELECT * FROM bookings")   # Get all bookings
-        rows = cursor.fetchall()   # Retrieve all results.
-        if rows:
-            print("\n=== Current Booking Information ===")   # Title
-            for row in rows:
-                print(f"number: {row[0]} | name: {row[1]} | passport: {row[2]} | seat: {row[3]} | meal: {row[4]}")   # Display data
-        else:
+        if flight is None:
+            flight = input("Please enter the flight number (press Enter for all flights): ").strip().upper() or None
+        shown = 0
+        for booking in iter_bookings(db_name, flight=flight, chunk_size=max(page_size, MANIFEST_CHUNK_SIZE)):
+            if shown == 0:
+                print("\n=== Current Booking Information ===")   # Title
+            elif shown % page_size == 0:
+                if input("Press Enter for more bookings, or q to stop: ").strip().lower() == 'q':
+                    return
+            print(f"number: {booking.id} | name: {booking.name} | passport: {booking.passport} | flight: {booking.flight} | seat: {booking.seat} | meal: {booking.meal}")   # Display data
+            shown += 1
+        if shown == 0:
             print("There are no bookings available at this time.")   # No results
-        conn.close()
     except Exception as e:
         print("Unable to read booking information:",e)   # Print error if any
 
+def find_passenger(db_name=DEFAULT_DB):
+    """
+    Looks bookings up by booking number, passport number or the start of the passenger's name.
+    Tries the booking number first, then the passport, then the name.
+    """
+    try:
+        text = input("Please enter a booking number, passport number or name: ").strip()
+        if not text:
+            print("Input cannot be empty.")   # Empty input
+            return
+        booking = find_booking(text, db_name)
+        rows = [booking] if booking is not None else find_by_passport(text, db_name) or search_by_name(text, db_name)
+        if not rows:
+            print("No matching bookings were found.")   # No results
+            return
+        for booking in rows:
+            print(f"number: {booking.id} | name: {booking.name} | passport: {booking.passport} | flight: {booking.flight} | seat: {booking.seat} | meal: {booking.meal}")
+        if len(rows) == MANIFEST_PAGE_SIZE:
+            print(f"Showing the first {MANIFEST_PAGE_SIZE} matches, type more of the name to narrow the search.")
+    except Exception as e:
+        print("Unable to search the bookings:",e)   # Print error if any
+
 # ----------- Main Menu Functions -----------
-def main_menu():
+def main_menu(db_name=DEFAULT_DB):
     """
     Displays the main menu and handles user input.
     Includes all function entries and exit mechanisms.
     """
-    initial_database() # Initialise the database before the program starts
+    initial_database(db_name) # Initialise the database before the program starts
+    enable_seat_cache(ttl=SEAT_CACHE_TTL)   # Repeated seat checks are answered from memory
     # Main loop, displays menu until user selects exit
     while True:
         print("\n=== Apache Airlines Booking system ===")
@@ -182,25 +1541,28 @@ def main_menu():
         print("2. Reserve your seat")
         print("3. Cancellation")
         print("4. Show booking information")
-        print("5. Log out of the system")
+        print("5. Find a booking")
+        print("6. Log out of the system")
         
         # Get user input
         choice = input("Please enter the operation number: ").strip()
 
         # Call the appropriate function based on the user's choice
         if choice == '1':
-            view_seats()   # Show seat status
+            view_seats(db_name)   # Show seat status
         elif choice == '2':
-            reserve_seat()   # Start reservation
+            reserve_seat(db_name)   # Start reservation
         elif choice == '3':
-            cancel_booking()   # Cancel booking
+            cancel_booking(db_name)   # Cancel booking
         elif choice == '4':
-            show_booking_info()   # Show all bookings
+            show_booking_info(db_name)   # Show all bookings
         elif choice == '5':
+            find_passenger(db_name)   # Search by number, passport or name
+        elif choice == '6':
             print("Thank you for using the Apache Airlines booking system,bye!")
             break   # Exit the loop and terminate the programme
         else:
-            print("Invalid entry, enter a number between 1 and 5.")   # Invalid input
+            print("Invalid entry, enter a number between 1 and 6.")   # Invalid input
             
 # ----------- Main Programme Entry -----------
 if __name__ == "__main__":
@@ -0,0 +1,233 @@
+# Apache Airlines - Booking Import and Export
+# Description: Streams bookings between the database and CSV or JSON-lines files.
+# Usage:
+#   python booking_transfer.py export bookings.csv [--db DB] [--flight FLIGHT]
+#   python booking_transfer.py import passengers.jsonl [--db DB] [--fast] [--keep-ids]
+#
+# Files hold one booking per line with the fields booking_id, name, passport, seat, meal and flight.
+# CSV files start with a header line naming them; booking_id, meal and flight may be left out on import.
+
+import argparse # Import the command line parsing module
+import csv # Import the CSV reading and writing module
+import itertools # Import the iterator helpers
+import json # Import the JSON module
+import os # Import the file path module
+import sys # Import the system module
+import time # Import the timing module
+from contextlib import closing, contextmanager, nullcontext # Import the context manager helpers
+
+import booking_system # Import the booking system the rows go in and out of
+
+FIELDS = ("booking_id", "name", "passport", "seat", "meal", "flight")   # Columns of an import or export file.
+IMPORT_CHUNK_SIZE = 50_000   # Rows validated and committed per transaction during an import.
+EXPORT_CHUNK_SIZE = 10_000   # Rows fetched from the cursor and written at a time during an export.
+IMPORT_ERROR_LIMIT = 100   # Invalid rows reported individually; the rest are only counted.
+# Like booking_system.INSERT_BOOKING_SQL, skips seats held by a customer who is still booking (?7 is the time),
+# but also ignores rows whose kept booking number is already taken.
+IMPORT_BOOKING_SQL = ("INSERT OR IGNORE INTO bookings (id, name, passport, seat, meal_code, flight) "
+                      "SELECT ?1, ?2, ?3, ?4, ?5, ?6 WHERE NOT EXISTS (SELECT 1 FROM seat_holds "
+                      "WHERE flight = ?6 AND seat = ?4 AND expires > ?7)")
+
+def _format(path, fmt):
+    """
+    Returns "csv" or "jsonl": fmt if given, otherwise taken from the file extension.
+    """
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Unknown file format {fmt}, expected csv or jsonl.")
+    return fmt
+
+class Progress:
+    """
+    Prints a running row count and rate to stderr at most every interval seconds. Pass as progress=Progress().
+    """
+
+    def __init__(self, interval=1.0, stream=sys.stderr):
+        self.interval = interval
+        self.stream = stream
+        self._start = self._last = time.perf_counter()
+
+    def __call__(self, rows, done=False):
+        now = time.perf_counter()
+        if done or now - self._last >= self.interval:
+            self._last = now
+            rate = rows / max(now - self._start, 1e-9)
+            self.stream.write(f"\r{rows:>12,} rows   {rate:>10,.0f} rows/s" + ("\n" if done else ""))
+            self.stream.flush()
+
+# ----------- Export -----------
+def export_bookings(path, db_name=booking_system.DEFAULT_DB, fmt=None, flight=None, progress=None,
+                    chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Writes every booking (or one flight's) to a CSV or JSON-lines file, in booking order, and returns the count.
+    Rows are streamed from one query, which also makes the file a consistent snapshot of the database.
+    progress, if given, is called as progress(rows_written) after each chunk and progress(total, done=True).
+    """
+    fmt = _format(path, fmt)
+    sql = ("SELECT b.id, b.name, b.passport, b.seat, m.label, b.flight FROM bookings b "
+           "LEFT JOIN meals m ON m.code = b.meal_code")
+    params = ()
+    if flight is not None:
+        sql += " WHERE b.flight = ?"
+        params = (flight,)
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as file, \
+            booking_system.get_pool(db_name).connection() as conn:
+        cursor = conn.execute(sql + " ORDER BY b.rowid", params)
+        if fmt == "csv":
+            writer = csv.writer(file)
+            writer.writerow(FIELDS)
+            write_rows = writer.writerows
+        else:
+            encode = json.JSONEncoder(ensure_ascii=False).encode
+            write_rows = lambda rows: file.writelines(encode(dict(zip(FIELDS, row))) + "\n" for row in rows)
+        while rows := cursor.fetchmany(chunk_size):
+            write_rows(rows)
+            written += len(rows)
+            if progress is not None:
+                progress(written)
+    if progress is not None:
+        progress(written, done=True)
+    return written
+
+# ----------- Import -----------
+def _read_records(file, fmt):
+    """
+    Yields (line number, {field: value}) for every record of an open import file.
+    """
+    if fmt == "jsonl":
+        for line_number, line in enumerate(file, 1):
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None   # Reported as an invalid row.
+                yield line_number, record if isinstance(record, dict) else None
+        return
+    reader = csv.reader(file)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [name.strip().lower() for name in header]
+    missing = {"name", "passport", "seat"} - set(header)
+    if missing:
+        raise ValueError(f"The CSV header is missing {', '.join(sorted(missing))}.")
+    for values in reader:
+        if values:
+            yield reader.line_num, dict(zip(header, values))
+
+@contextmanager
+def _fast_load(conn):
+    """
+    Switches off fsync for the duration of a bulk load and restores the previous settings afterwards.
+    A crash during the load can lose the rows committed by it, but never corrupts the rows already there.
+    """
+    synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+    cache_size = conn.execute("PRAGMA cache_size").fetchone()[0]
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")   # 256 MiB of page cache while the indexes grow.
+    try:
+        yield
+    finally:
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+        conn.execute(f"PRAGMA cache_size={cache_size}")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")   # Write the load into the database file now.
+
+def import_bookings(path, db_name=booking_system.DEFAULT_DB, fmt=None, fast=False, keep_ids=False, progress=None,
+                    chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Loads bookings from a CSV or JSON-lines file, chunk_size rows per transaction.
+    Every row is validated like a reservation (known flight and meal, a seat on the aircraft, a name and
+    passport); invalid rows, and rows whose seat (or kept booking number) is already taken or whose seat is
+    held, are skipped.
+    New booking numbers are allocated unless keep_ids is set, which keeps the file's numbers to restore an
+    export of this system (numbers from before the allocator would push the sequence far ahead).
+    fast switches fsync off while loading.
+    Returns (imported, skipped, errors) where errors lists (line, reason) for the first invalid rows.
+    progress, if given, is called as progress(rows_read) after each chunk and progress(total, done=True).
+    """
+    fmt = _format(path, fmt)
+    allocator = booking_system.get_id_allocator(db_name)
+    layouts, meals = {}, {}   # Flight -> SeatLayout and meal label -> code, looked up once per value.
+    imported = read = 0
+    errors = []
+    highest_kept = -1   # Highest sequence number behind a kept booking number.
+
+    def check(record):
+        """
+        Returns the row to insert (without its booking number) and the kept booking number, or raises ValueError.
+        """
+        if record is None:
+            raise ValueError("Not a booking record.")
+        name, passport = (record.get("name") or "").strip(), (record.get("passport") or "").strip()
+        if not name or not passport:
+            raise ValueError("Input cannot be empty.")
+        flight = (record.get("flight") or booking_system.DEFAULT_FLIGHT).strip().upper()
+        if flight not in layouts:
+            layouts[flight] = booking_system.get_flight_layout(flight, db_name)   # ValueError if unknown.
+        seat = (record.get("seat") or "").strip().upper()
+        if not booking_system.is_valid_seat_format(seat, layouts[flight]):
+            raise ValueError(f"Invalid seat number {seat}.")
+        meal = record.get("meal") or None
+        if meal not in meals:
+            meals[meal] = booking_system.meal_code(meal, db_name)   # ValueError if unknown.
+        booking_id = None
+        if keep_ids:
+            booking_id = (record.get("booking_id") or "").strip().upper()
+            booking_system.decode_booking_id(booking_id)   # ValueError unless it is a booking number.
+        return (name, passport, seat, meals[meal], flight), booking_id
+
+    # Own connection, outside the pool: check() and the allocator borrow pooled connections while it is open.
+    with open(path, newline="", encoding="utf-8") as file, closing(booking_system.open_connection(db_name)) as conn:
+        with _fast_load(conn) if fast else nullcontext():
+            records = _read_records(file, fmt)
+            while chunk := list(itertools.islice(records, chunk_size)):
+                rows, kept = [], []
+                for line_number, record in chunk:
+                    try:
+                        row, booking_id = check(record)
+                    except (ValueError, TypeError, AttributeError) as e:   # The last two: a field of the wrong type.
+                        if len(errors) < IMPORT_ERROR_LIMIT:
+                            errors.append((line_number, str(e) or "Invalid field."))
+                        continue
+                    rows.append(row)
+                    kept.append(booking_id)
+                if keep_ids:
+                    highest_kept = max([highest_kept, *map(booking_system.decode_booking_id, kept)])
+                    booking_ids = kept
+                else:
+                    booking_ids = allocator.allocate(len(rows))
+                with booking_system.transaction(conn):
+                    before, now = conn.total_changes, time.time()
+                    conn.executemany(IMPORT_BOOKING_SQL,
+                                     ((booking_id, *row, now) for booking_id, row in zip(booking_ids, rows)))
+                    imported += conn.total_changes - before
+                read += len(chunk)
+                if progress is not None:
+                    progress(read)
+            if highest_kept >= 0:   # New bookings must not be given a number the file brought in.
+                allocator.advance_past(highest_kept)
+    booking_system.forget_cached_seats(db_name)
+    if progress is not None:
+        progress(read, done=True)
+    return imported, read - imported, errors
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apache Airlines booking import and export")
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("path", help="CSV (.csv) or JSON-lines (.jsonl) file")
+    parser.add_argument("--db", default=booking_system.DEFAULT_DB, help="database file")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="file format (default: from the extension)")
+    parser.add_argument("--flight", help="export one flight only")
+    parser.add_argument("--fast", action="store_true", help="import without fsync (re-run the import after a crash)")
+    parser.add_argument("--keep-ids", action="store_true", help="keep the booking numbers in the file")
+    args = parser.parse_args()
+    booking_system.initial_database(args.db)
+    if args.command == "export":
+        export_bookings(args.path, args.db, args.format, args.flight, progress=Progress())
+    else:
+        imported, skipped, errors = import_bookings(args.path, args.db, args.format, args.fast, args.keep_ids,
+                                                    progress=Progress())
+        for line_number, reason in errors:
+            print(f"line {line_number}: {reason}")
+        print(f"Imported {imported:,} bookings, skipped {skipped:,}.")
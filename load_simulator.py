@@ -0,0 +1,216 @@
+# Apache Airlines - Load Simulator
+# Description: Reproducible benchmark suite. Seeds a temporary database, drives scripted workloads in one
+# or several processes and writes throughput, latency percentiles and peak RSS to JSON.
+# Usage:
+#   python load_simulator.py --bookings 100000 --flights 400 --ops 20000 --output run.json
+#   python load_simulator.py --processes 4 --workload booking_rush --output run.json
+#   python load_simulator.py --output new.json --baseline old.json --tolerance 0.15   # exit 1 on regression
+
+import argparse # Import the command line parsing module
+import json # Import the JSON module
+import multiprocessing # Import the process pool module
+import os # Import the file path module
+import platform # Import the platform information module
+import random # Import the Generate Random Numbers module
+import resource # Import the resource usage module (peak RSS)
+import sqlite3 # Import SQLite Database Module
+import sys # Import the system module
+import tempfile # Import the temporary directory module
+import time # Import the timing module
+
+import booking_system # Import the booking system being measured
+from booking_system import MEALS # Import the meal preferences (a meal's code is its position)
+
+SEED_ROWS, SEED_COLUMNS = 50, "ABCDEFGHJK"   # 500-seat aircraft used for every seeded flight.
+ID_SEED_BASE = 10 ** 12   # Booking number sequence used for seeded rows, far beyond the allocator's.
+
+# ----------- Seeding -----------
+def seed_database(db_name, bookings, flights=None):
+    """
+    Creates the schema with initial_database() and fills it with bookings spread evenly over flights
+    500-seat flights (by default enough for them to be half full). The content depends only on the arguments.
+    """
+    per_flight = SEED_ROWS * len(SEED_COLUMNS)
+    flights = flights or max(1, -(-2 * bookings // per_flight))
+    if bookings > flights * per_flight:
+        raise ValueError(f"{bookings} bookings do not fit on {flights} flights of {per_flight} seats.")
+    booking_system.initial_database(db_name)
+    for number in range(flights):
+        booking_system.add_flight(f"SEED{number:05d}", SEED_ROWS, SEED_COLUMNS, db_name)
+    layout = booking_system.seat_layout(SEED_ROWS, SEED_COLUMNS)
+    rows = ((booking_system.encode_booking_id(ID_SEED_BASE + i), f"Passenger {i}", f"P{i:08d}",
+             layout.seat_at(i // flights), i % len(MEALS), f"SEED{i % flights:05d}") for i in range(bookings))
+    with booking_system.get_pool(db_name).connection() as conn, booking_system.transaction(conn):
+        conn.executemany("INSERT INTO bookings (id, name, passport, seat, meal_code, flight) VALUES (?, ?, ?, ?, ?, ?)",
+                         rows)
+    return flights
+
+# ----------- Workloads -----------
+# Each workload runs ops operations against db_name and returns the latency of each one in seconds.
+def _timed(operation, ops):
+    latencies = []
+    for i in range(ops):
+        start = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def seat_map_storm(db_name, flights, ops, rng):
+    """Seat map screens for random flights."""
+    return _timed(lambda i: booking_system.get_seat_map(db_name, f"SEED{rng.randrange(flights):05d}"), ops)
+
+def booking_rush(db_name, flights, ops, rng):
+    """Reservations of random seats on random flights; some lose the seat to an earlier booking."""
+    layout = booking_system.seat_layout(SEED_ROWS, SEED_COLUMNS)
+    return _timed(lambda i: booking_system.reserve(f"Rush {i}", f"R{i:08d}", layout.seat_at(rng.randrange(layout.size)),
+                                                   rng.choice(MEALS), db_name, f"SEED{rng.randrange(flights):05d}"),
+                  ops)
+
+def mixed_cancels(db_name, flights, ops, rng):
+    """Half reservations, a third cancellations of earlier ones, the rest seat checks."""
+    layout = booking_system.seat_layout(SEED_ROWS, SEED_COLUMNS)
+    booked = []
+
+    def operation(i):
+        roll, flight = rng.random(), f"SEED{rng.randrange(flights):05d}"
+        seat = layout.seat_at(rng.randrange(layout.size))
+        if roll < 0.5 or not booked:
+            booking_id = booking_system.reserve(f"Mixed {i}", f"M{i:08d}", seat, "Standard", db_name, flight)
+            if booking_id is not None:
+                booked.append(booking_id)
+        elif roll < 0.83:
+            booking_system.cancel(booked.pop(rng.randrange(len(booked))), db_name)
+        else:
+            booking_system.is_seat_reserved(seat, db_name, flight)
+
+    return _timed(operation, ops)
+
+def manifest_dump(db_name, flights, ops, rng):
+    """Streams the whole booking manifest; ops is capped because each one reads every row."""
+    return _timed(lambda i: sum(1 for _ in booking_system.iter_bookings(db_name)), max(1, min(ops, 20)))
+
+WORKLOADS = {
+    "seat_map_storm": seat_map_storm,
+    "booking_rush": booking_rush,
+    "mixed_cancels": mixed_cancels,
+    "manifest_dump": manifest_dump,
+}
+
+# ----------- Running -----------
+def _peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss   # Kilobytes on Linux, but bytes on macOS.
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def _worker(args):
+    """
+    Runs one workload share in this process and returns (latencies, start time, end time, peak RSS in KB).
+    """
+    workload, db_name, flights, ops, seed = args
+    start = time.time()
+    latencies = WORKLOADS[workload](db_name, flights, ops, random.Random(seed))
+    end = time.time()
+    booking_system.close_all_pools()
+    return latencies, start, end, _peak_rss_kb()
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def run_workload(workload, db_name, flights, ops, processes=1, seed=0):
+    """
+    Runs a workload split across processes and summarises the results.
+    Worker i uses random seed seed + i, so a run with the same arguments repeats the same requests.
+    Every worker is a fresh process, even for processes=1: peak RSS only ever grows, so measured in this
+    process it would include the seeding and every earlier workload.
+    """
+    shares = [(workload, db_name, flights, ops // processes + (i < ops % processes), seed + i)
+              for i in range(processes)]
+    booking_system.close_all_pools()   # The workers open their own connections; do not keep ours open meanwhile.
+    with multiprocessing.get_context("spawn").Pool(processes, maxtasksperchild=1) as pool:
+        results = pool.map(_worker, shares, chunksize=1)
+    # Measured from the first worker starting to the last one finishing, so process start-up is not counted.
+    elapsed = max(end for _, _, end, _ in results) - min(start for _, start, _, _ in results)
+    latencies = sorted(latency for share, _, _, _ in results for latency in share)
+    return {
+        "ops": len(latencies),
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p90_ms": _percentile(latencies, 0.90) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "peak_rss_kb": max(rss for _, _, _, rss in results),
+    }
+
+def run_suite(workloads=tuple(WORKLOADS), bookings=50_000, flights=None, ops=5000, processes=1, seed=0):
+    """
+    Seeds a fresh temporary database for every workload and runs it. Returns the JSON-ready results.
+    """
+    results = {
+        "meta": {"bookings": bookings, "flights": flights, "ops": ops, "processes": processes, "seed": seed,
+                 "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                 "platform": platform.platform(), "cpus": os.cpu_count(), "started": time.time()},
+        "workloads": {},
+    }
+    for workload in workloads:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_name = os.path.join(tmp, "suite.db")
+            seeded_flights = seed_database(db_name, bookings, flights)
+            results["meta"]["flights"] = seeded_flights
+            results["workloads"][workload] = run_workload(workload, db_name, seeded_flights, ops, processes, seed)
+            booking_system.close_pool(db_name)
+    return results
+
+# ----------- Regression Gate -----------
+def compare(results, baseline, tolerance=0.1):
+    """
+    Compares results with a baseline run. A workload regresses when its throughput drops, or its p99
+    latency grows, by more than tolerance (a fraction). Returns a list of regression messages.
+    """
+    regressions = []
+    for workload, new in results["workloads"].items():
+        old = baseline.get("workloads", {}).get(workload)
+        if old is None:
+            continue
+        if new["throughput"] < old["throughput"] * (1 - tolerance):
+            regressions.append(f"{workload}: throughput {new['throughput']:,.0f} ops/s "
+                               f"< baseline {old['throughput']:,.0f} ops/s")
+        if new["p99_ms"] > old["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{workload}: p99 {new['p99_ms']:.2f} ms > baseline {old['p99_ms']:.2f} ms")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apache Airlines benchmark suite and load simulator")
+    parser.add_argument("--workload", action="append", choices=WORKLOADS, help="workload to run (repeatable)")
+    parser.add_argument("--bookings", type=int, default=50_000, help="bookings seeded before each workload")
+    parser.add_argument("--flights", type=int, help="flights to spread them over (default: as few as fit)")
+    parser.add_argument("--ops", type=int, default=5000, help="operations per workload")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes sharing the database")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed regression as a fraction")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.workload or tuple(WORKLOADS), args.bookings, args.flights, args.ops,
+                        args.processes, args.seed)
+    for workload, result in results["workloads"].items():
+        print(f"{workload:<16} {result['throughput']:>10,.0f} ops/s   p50 {result['p50_ms']:7.3f} ms   "
+              f"p99 {result['p99_ms']:7.3f} ms   peak RSS {result['peak_rss_kb'] / 1024:6.1f} MiB")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        for setting in ("bookings", "flights", "ops", "processes", "seed"):
+            if baseline["meta"].get(setting) != results["meta"][setting]:
+                print(f"WARNING: baseline was run with {setting}={baseline['meta'].get(setting)}, "
+                      f"this run used {results['meta'][setting]}.")
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION:", regression)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
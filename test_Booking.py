@@ -1,9 +1,38 @@
 import unittest   # Importing Python's Built-in Unit Testing Framework
 import sqlite3   # Import modules for manipulating SQLite databases
 import os   # Import OS file path module
+import threading   # Import the threading module for contention tests
+import asyncio   # Import the asynchronous I/O module for server tests
+import json   # Import the JSON module for server tests
+import time   # Import the timing module for hold expiry tests
 
 # Import the function to be tested from the main system module
 from booking_system import generate_booking_id, is_valid_seat_format, is_seat_reserved, initial_database
+from booking_system import get_pool, close_pool, close_all_pools, save_booking, get_seat_map, reserve
+from booking_system import BookingIdAllocator, encode_booking_id, reserve_many
+from booking_system import add_flight, get_flight_layout, iter_bookings, cancel, find_booking, GroupCommitQueue
+from booking_system import enable_seat_cache, disable_seat_cache, find_by_passport, search_by_name, Booking
+from booking_system import hold_seat, release_hold, is_seat_available, get_hold_sweeper
+from booking_system import schema_version, SCHEMA_VERSION, get_id_allocator, SeatHoldSweeper
+from booking_server import BookingServer
+from booking_shards import ShardedBookingStore, shard_path
+from booking_transfer import export_bookings, import_bookings
+from booking_metrics import metrics
+import booking_system
+import load_simulator
+
+def create_test_database(test_db):
+    """Create a fresh test database."""
+    if os.path.exists(test_db):   # If a file with the same name previously existed
+        os.remove(test_db)   # Delete the old database file
+    initial_database(test_db)   # Initialise the system structure using the test database
+
+def remove_test_database(test_db):
+    """Remove a test database and its WAL files."""
+    close_pool(test_db)   # Close pooled connections before deleting the file
+    for path in (test_db, test_db + "-wal", test_db + "-shm"):
+        if os.path.exists(path):   # Clean up the test database (and WAL files) after testing
+            os.remove(path)
 
 # Create test classes
 class TestBookingSystem(unittest.TestCase):
@@ -11,17 +40,14 @@ class TestBookingSystem(unittest.TestCase):
     def setUp(self):
         """Create a fresh test database before each test."""
         self.test_db = "test_airlines.db"   # Define the name of the database file for testing
-        if os.path.exists(self.test_db):   # If a file with the same name previously existed
-            os.remove(self.test_db)   # Delete the old database file
-        initial_database(self.test_db)   # Initialise the system structure using the test database
+        create_test_database(self.test_db)
 
     def tearDown(self):
         """Remove the test database after each test."""
-        if os.path.exists(self.test_db):   # Clean up the test database after testing
-            os.remove(self.test_db)   
+        remove_test_database(self.test_db)
 
     def test_generate_booking_id(self):
-        booking_id = generate_booking_id()   # Calling a function to generate a predefined number
+        booking_id = generate_booking_id(self.test_db)   # Calling a function to generate a predefined number
         self.assertEqual(len(booking_id), 8)   # Check that the length of the booking number is 8
         self.assertTrue(booking_id.isalnum())   # Check that the booking number is a combination of letters + numbers
         self.assertTrue(booking_id.isupper())   # Check that the booking number is a combination of letters + numbers
@@ -40,14 +66,540 @@ class TestBookingSystem(unittest.TestCase):
         # Insert a scheduled record for testing
         conn = sqlite3.connect(self.test_db)   # Linking test databases
         cursor = conn.cursor()   # Get cursor
-        cursor.execute("INSERT INTO bookings (id, name, passport, seat, meal) VALUES (?, ?, ?, ?, ?)",
-                       ("TST12345", "Alice", "P12345678", seat, "Vegetarian"))   # Insert test data
+        cursor.execute("INSERT INTO bookings (id, name, passport, seat, meal_code) VALUES (?, ?, ?, ?, ?)",
+                       ("TST12345", "Alice", "P12345678", seat, 1))   # Insert test data
 
         conn.commit()   # Submit changes
         conn.close()   # close the connection
 
         self.assertTrue(is_seat_reserved(seat, self.test_db))   #  This should be booked
 
+    def test_connection_pool_reuses_connections(self):
+        pool = get_pool(self.test_db)   # Pool shared by every booking function
+        self.assertIs(pool, get_pool(self.test_db))   # Same file, same pool
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            self.assertIs(first, second)   # The idle connection is handed out again
+            mode = second.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")   # Pragmas are applied when the connection is opened
+
+    def test_save_booking(self):
+        save_booking("TST00001", "Bob", "P87654321", "3A", "Halal", self.test_db)   # Save through the pool
+        self.assertTrue(is_seat_reserved("3A", self.test_db))   # Visible to later lookups
+
+    def test_seat_map(self):
+        save_booking("TST00002", "Carol", "P11112222", "2A", "Standard", self.test_db)   # Reserve one seat
+        seat_map = get_seat_map(self.test_db)   # Load the whole aircraft in one query
+        self.assertTrue(seat_map.is_reserved("2A"))   # Reserved seat
+        self.assertFalse(seat_map.is_reserved("3A"))   # Free seat
+        self.assertFalse(seat_map.is_reserved("16A"))   # Not on the aircraft
+        self.assertEqual(seat_map.reserved_count(), 1)
+        self.assertEqual(seat_map.occupancy(), "0100000000")
+        self.assertEqual(len(list(seat_map.seats())), 10)   # 1A to 10A
+
+    def test_reserve_is_atomic_under_contention(self):
+        results = []   # Booking numbers returned by each thread
+        def book():
+            results.append(reserve("Dave", "P22223333", "7a", "Standard", self.test_db))
+        threads = [threading.Thread(target=book) for _ in range(8)]   # Eight bookers race for seat 7A
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len([r for r in results if r is not None]), 1)   # Exactly one winner
+        self.assertIsNone(reserve("Eve", "P33334444", "7A", "Halal", self.test_db))   # Seat is now taken
+        with get_pool(self.test_db).connection() as conn:
+            plan = conn.execute("EXPLAIN QUERY PLAN SELECT 1 FROM bookings WHERE flight = ? AND seat = ?", ("AA001", "7A")).fetchall()
+        self.assertIn("idx_bookings_flight_seat", str(plan))   # Seat lookups use the index
+
+    def test_booking_id_allocator_blocks(self):
+        first = BookingIdAllocator(self.test_db, block_size=10)   # Two allocators act like two processes
+        second = BookingIdAllocator(self.test_db, block_size=10)
+        ids = [first.next_id() for _ in range(15)] + [second.next_id() for _ in range(15)]
+        ids += first.allocate(25) + second.allocate(3)   # Batches for bulk inserts
+        self.assertEqual(len(ids), 58)
+        self.assertEqual(len(set(ids)), len(ids))   # No collisions across allocators
+        self.assertTrue(all(len(i) == 8 and i.isalnum() and i == i.upper() for i in ids))
+
+    def test_booking_id_collision_stress(self):
+        ids = set(map(encode_booking_id, range(2_000_000)))   # Two million consecutive sequence numbers
+        self.assertEqual(len(ids), 2_000_000)   # Every one maps to a different booking number
+
+    def test_reserve_many(self):
+        group = [("Ann", "P1", "1A", "Standard"), ("Ben", "P2", "2a", "Halal"), ("Cat", "P3", "3A", "No Meal")]
+        ids, failures = reserve_many(group, self.test_db)   # Whole group in one transaction
+        self.assertEqual(failures, [])
+        self.assertEqual(len(set(ids)), 3)
+        self.assertEqual(get_seat_map(self.test_db).reserved_count(), 3)
+
+    def test_reserve_many_reports_malformed_rows(self):
+        group = [("Eli", "P5", "6A"), (None, "P6", "7A", "Standard"), ("Fin", "P7", "8A", ["Halal"]),
+                 ("Gia", "P8", "9A", "Standard")]
+        ids, failures = reserve_many(group, self.test_db)
+        self.assertEqual(ids, [])
+        self.assertEqual([position for position, _ in failures], [0, 1, 2])   # Each bad row, not an exception
+        self.assertEqual(get_seat_map(self.test_db).reserved_count(), 0)
+
+    def test_reserve_many_is_all_or_nothing(self):
+        save_booking("TST00003", "Dan", "P4", "5A", "Standard", self.test_db)   # 5A is already taken
+        group = [("Eli", "P5", "4A", "Standard"), ("Fay", "P6", "5A", "Standard"),
+                 ("Gus", "P7", "16A", "Standard"), ("Hal", "P8", "4A", "Standard")]
+        ids, failures = reserve_many(group, self.test_db)
+        self.assertEqual(ids, [])
+        self.assertEqual([position for position, _ in failures], [2, 3])   # Invalid seat, duplicate seat
+        ids, failures = reserve_many(group[:2], self.test_db)
+        self.assertEqual(failures, [(1, "Seat 5A is already booked.")])   # Conflict found by the set query
+        self.assertFalse(is_seat_reserved("4A", self.test_db))   # Nothing from the group was saved
+
+    def test_flights_and_layouts(self):
+        add_flight("ba123", 30, "ABCDEF", self.test_db)   # 180-seat aircraft
+        layout = get_flight_layout("BA123", self.test_db)
+        self.assertTrue(is_valid_seat_format("30F", layout))
+        self.assertFalse(is_valid_seat_format("31A", layout))   # Row out of range
+        self.assertFalse(is_valid_seat_format("12G", layout))   # Column not on this aircraft
+        self.assertIsNotNone(reserve("Ivy", "P9", "12C", "Standard", self.test_db, "BA123"))
+        self.assertTrue(is_seat_reserved("12C", self.test_db, "BA123"))
+        self.assertFalse(is_seat_reserved("12C", self.test_db))   # Other flights are independent
+        self.assertEqual(get_seat_map(self.test_db, "BA123").free_count(), 179)
+        with self.assertRaises(ValueError):
+            reserve("Jo", "P10", "1A", "Standard", self.test_db, "XX999")   # Unknown flight
+        # Flight numbers are case-insensitive everywhere, as add_flight() stores them in upper case
+        self.assertIsNotNone(reserve("Kim", "P11", "1a", "Halal", self.test_db, " ba123"))
+        self.assertIsNotNone(hold_seat("2A", self.test_db, "ba123"))
+        self.assertEqual(reserve_many([("Lea", "P12", "3A", "Standard")], self.test_db, "ba123")[1], [])
+        writes = GroupCommitQueue(self.test_db)
+        self.assertIsNotNone(writes.reserve("Max", "P13", "4A", "Standard", "ba123").result(timeout=5))
+        writes.close()
+        self.assertTrue(is_seat_reserved("4A", self.test_db, "ba123"))
+        self.assertEqual(get_seat_map(self.test_db, "ba123", include_holds=True).free_count(), 175)
+
+    def test_old_database_is_upgraded(self):
+        close_pool(self.test_db)
+        os.remove(self.test_db)
+        conn = sqlite3.connect(self.test_db)   # Database created by the first version of the system
+        conn.execute("CREATE TABLE bookings(id TEXT PRIMARY KEY, name TEXT NOT NULL, passport TEXT NOT NULL, "
+                     "seat TEXT NOT NULL, meal TEXT)")
+        conn.execute("INSERT INTO bookings VALUES ('OLD00001', 'Kim', 'P11', '8A', 'Standard')")
+        conn.execute("INSERT INTO bookings VALUES ('OLD00002', 'Kit', 'P13', '9A', 'Kosher')")   # Free-text meal
+        conn.commit()
+        conn.close()
+        initial_database(self.test_db)   # Adds the flight column and the per-flight seat index
+        self.assertTrue(is_seat_reserved("8A", self.test_db))   # Old bookings belong to the default flight
+        self.assertIsNone(reserve("Lee", "P12", "8A", "Standard", self.test_db))
+        self.assertEqual(search_by_name("KI", self.test_db)[0].id, "OLD00001")   # Old names are searchable
+        self.assertEqual(find_booking("OLD00001", self.test_db).meal, "Standard")   # Meals converted to codes
+        self.assertEqual(find_booking("OLD00002", self.test_db).meal, "Kosher")   # Unknown labels are kept
+        with get_pool(self.test_db).connection() as conn:
+            self.assertEqual(schema_version(conn), SCHEMA_VERSION)   # Versioned from now on
+
+    def test_close_all_pools_forgets_databases(self):
+        hold_seat("3A", self.test_db)
+        sweeper = get_hold_sweeper(self.test_db)
+        close_all_pools()
+        self.assertIsNot(get_hold_sweeper(self.test_db), sweeper)   # The old sweeper was closed and dropped
+        remove_test_database(self.test_db)
+        initial_database(self.test_db)   # Not skipped: the deleted file is created again
+        self.assertIsNotNone(reserve("Lou", "P45", "3A", "Standard", self.test_db))
+
+    def test_schema_version(self):
+        with get_pool(self.test_db).connection() as conn:
+            applied = conn.execute("SELECT version, applied FROM schema_version ORDER BY version").fetchall()
+        self.assertEqual([version for version, _ in applied], list(range(1, SCHEMA_VERSION + 1)))
+        close_pool(self.test_db)   # Forget that this process already checked the file
+        statements = []
+        with get_pool(self.test_db).connection() as conn:
+            conn.set_trace_callback(statements.append)
+        initial_database(self.test_db)   # Up to date: one version query, no migrations
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith("SELECT"))
+        initial_database(self.test_db)   # Already checked by this process: no queries at all
+        self.assertEqual(len(statements), 1)
+        with get_pool(self.test_db).connection() as conn:
+            conn.set_trace_callback(None)
+            self.assertEqual(conn.execute("SELECT version, applied FROM schema_version ORDER BY version").fetchall(),
+                             applied)   # Nothing re-applied
+            conn.execute("INSERT INTO schema_version VALUES (?, 0)", (SCHEMA_VERSION + 1,))   # Written by newer code
+        close_pool(self.test_db)
+        with self.assertRaises(RuntimeError):
+            initial_database(self.test_db)
+
+    def test_iter_bookings_streams_in_chunks(self):
+        add_flight("BA123", 30, "ABCDEF", self.test_db)
+        group = [(f"P{row}", f"X{row}", f"{row}{letter}", "Halal" if letter == "A" else "Standard")
+                 for row in range(1, 31) for letter in "ABCDEF"]
+        reserve_many(group, self.test_db, "BA123")   # 180 bookings
+        reserve("Mia", "P13", "1A", "Halal", self.test_db)   # One on the default flight
+        booked = list(iter_bookings(self.test_db, chunk_size=7))   # Many small pages
+        self.assertEqual(len(booked), 181)
+        self.assertEqual(len({booking.id for booking in booked}), 181)   # No row repeated across pages
+        by_id = [booking.id for booking in iter_bookings(self.test_db, order_by="id", chunk_size=50)]
+        self.assertEqual(by_id, sorted(by_id))
+        halal = list(iter_bookings(self.test_db, flight="BA123", seat_rows=(5, 9), meal="Halal", chunk_size=2))
+        self.assertEqual(sorted(booking.seat for booking in halal), ["5A", "6A", "7A", "8A", "9A"])
+        with self.assertRaises(ValueError):
+            next(iter_bookings(self.test_db, order_by="passport"))
+
+    def test_cancel_and_find_booking(self):
+        booking_id = reserve("Ned", "P14", "9A", "No Meal", self.test_db)
+        self.assertEqual(find_booking(booking_id.lower(), self.test_db),
+                         Booking(booking_id, "Ned", "P14", "9A", "No Meal", "AA001"))
+        self.assertTrue(cancel(booking_id, self.test_db))
+        self.assertFalse(cancel(booking_id, self.test_db))   # Already cancelled
+        self.assertIsNone(find_booking(booking_id, self.test_db))
+
+    def test_lookups_hold_one_connection(self):
+        booking_id = reserve("Ann", "P46", "2A", "Halal", self.test_db)
+        close_pool(self.test_db)   # Meal labels are loaded again on first use
+        get_pool(self.test_db).max_size = 1   # A lookup needing a second connection would wait forever
+        found = []
+        lookup = threading.Thread(target=lambda: found.extend([find_booking(booking_id, self.test_db),
+                                                              *find_by_passport("P46", self.test_db),
+                                                              *search_by_name("an", self.test_db)]), daemon=True)
+        lookup.start()
+        lookup.join(timeout=5)
+        self.assertEqual([booking.meal for booking in found], ["Halal"] * 3)
+
+    def test_passenger_search(self):
+        add_flight("BA123", 30, "ABCDEF", self.test_db)
+        first = reserve("Ann Lee", "P20", "1A", "Standard", self.test_db)
+        second = reserve("  ANNA Smith ", "P20", "2B", "Halal", self.test_db, "BA123")   # Same passenger, second flight
+        reserve_many([("Annabel", "P21", "3A", "Standard"), ("Bo", "P22", "4A", "Standard")], self.test_db)
+        writes = GroupCommitQueue(self.test_db)
+        writes.reserve("annie", "P23", "5A", "Standard").result(timeout=5)
+        writes.close()
+        self.assertEqual([booking.id for booking in find_by_passport(" P20", self.test_db)], [first, second])
+        self.assertEqual([booking.name for booking in search_by_name("ann", self.test_db)],
+                         ["Ann Lee", "  ANNA Smith ", "Annabel", "annie"])   # Every insert path is searchable
+        self.assertEqual(len(search_by_name("ANN", self.test_db, limit=2)), 2)
+        self.assertEqual(search_by_name("anna s", self.test_db)[0].flight, "BA123")
+        self.assertEqual(search_by_name("zed", self.test_db), [])
+        with self.assertRaises(ValueError):
+            search_by_name(" ", self.test_db)
+        with get_pool(self.test_db).connection() as conn:
+            plans = [str(conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()) for sql, params in (
+                ("SELECT id FROM bookings WHERE passport = ?", ("P20",)),
+                ("SELECT id FROM bookings WHERE name_key >= ? AND name_key < ?", ("a", "b")))]
+        self.assertIn("idx_bookings_passport", plans[0])   # Lookups are index searches, not scans
+        self.assertIn("idx_bookings_name_key", plans[1])
+
+    def test_booking_records_share_meal_labels(self):
+        reserve_many([("Vi", "P24", "1A", "Vegetarian"), ("Wu", "P25", "2A", "Vegetarian")], self.test_db)
+        first, second = iter_bookings(self.test_db)
+        self.assertIs(first.meal, second.meal)   # One interned label, not a string per row
+        self.assertFalse(hasattr(first, "__dict__"))   # Slotted record
+        self.assertEqual(tuple(first)[1:], ("Vi", "P24", "1A", "Vegetarian", "AA001"))
+        with get_pool(self.test_db).connection() as conn:
+            self.assertEqual(conn.execute("SELECT DISTINCT meal_code FROM bookings").fetchall(), [(1,)])
+        with self.assertRaises(ValueError):
+            reserve("Xi", "P26", "3A", "Caviar", self.test_db)   # Unknown meal
+        self.assertEqual(reserve_many([("Xi", "P26", "3A", "Caviar")], self.test_db)[1][0][0], 0)
+        self.assertEqual(list(iter_bookings(self.test_db, meal="Caviar")), [])
+
+    def test_import_and_export(self):
+        add_flight("BA123", 30, "ABCDEF", self.test_db)
+        with open("test_import.csv", "w") as file:
+            file.write("name,passport,seat,meal,flight\n"
+                       "Ann,P30,1a,Halal,ba123\n"
+                       "Bob,P31,99Z,Standard,BA123\n"   # Not on the aircraft
+                       "Cy,P32,1A,Standard,BA123\n"   # Seat already taken by Ann
+                       "Di,P33,2B,Caviar,BA123\n"   # Unknown meal
+                       "Ed,P34,3A,,\n")   # Default flight, no meal
+        self.addCleanup(os.remove, "test_import.csv")
+        progress = []
+        imported, skipped, errors = import_bookings("test_import.csv", self.test_db, fast=True, chunk_size=2,
+                                                    progress=lambda rows, done=False: progress.append(rows))
+        self.assertEqual((imported, skipped), (2, 3))
+        self.assertEqual([line for line, _ in errors], [3, 5])   # Conflicts are skipped, not reported
+        self.assertEqual(progress, [2, 4, 5, 5])
+        self.assertTrue(is_seat_reserved("1A", self.test_db, "BA123"))
+        with get_pool(self.test_db).connection() as conn:
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)   # NORMAL restored after --fast
+
+        self.addCleanup(os.remove, "test_export.jsonl")
+        self.assertEqual(export_bookings("test_export.jsonl", self.test_db), 2)
+        with open("test_export.jsonl") as file:
+            exported = [json.loads(line) for line in file]
+        self.assertEqual([(row["name"], row["meal"], row["flight"]) for row in exported],
+                         [("Ann", "Halal", "BA123"), ("Ed", None, "AA001")])
+        restored = "test_restored.db"
+        create_test_database(restored)
+        self.addCleanup(remove_test_database, restored)
+        add_flight("BA123", 30, "ABCDEF", restored)
+        self.assertEqual(import_bookings("test_export.jsonl", restored, keep_ids=True)[:2], (2, 0))
+        with open("test_import.csv", "w") as file:   # Not booking numbers, though int(x, 36) would take them
+            file.write("booking_id,name,passport,seat\nAB_CDEFG,Gus,P48,5A\n-1234567,Hex,P49,6A\n")
+        self.assertEqual(import_bookings("test_import.csv", restored, keep_ids=True),
+                         (0, 2, [(2, "Invalid booking number AB_CDEFG."), (3, "Invalid booking number -1234567.")]))
+        self.assertEqual(find_booking(exported[0]["booking_id"], restored).name, "Ann")   # Same numbers
+        new_id = reserve("Fay", "P35", "4A", "Standard", restored)
+        self.assertNotIn(new_id, [row["booking_id"] for row in exported])   # Sequence moved past them
+
+    def test_import_holds_no_pooled_connection(self):
+        with open("test_import.csv", "w") as file:
+            file.write("name,passport,seat,meal\nXan,P47,2A,Halal\n")
+        self.addCleanup(os.remove, "test_import.csv")
+        close_pool(self.test_db)   # Cold layouts, meals and booking numbers, each loaded through the pool
+        get_pool(self.test_db).max_size = 1
+        result = []
+        loader = threading.Thread(target=lambda: result.append(import_bookings("test_import.csv", self.test_db)),
+                                  daemon=True)
+        loader.start()
+        loader.join(timeout=5)
+        self.assertEqual(result, [(1, 0, [])])
+
+    def test_import_skips_held_seats(self):
+        hold_id = hold_seat("5A", self.test_db)
+        with open("test_import.csv", "w") as file:
+            file.write("name,passport,seat\nUma,P36,5A\nVic,P37,6A\n")
+        self.addCleanup(os.remove, "test_import.csv")
+        self.assertEqual(import_bookings("test_import.csv", self.test_db), (1, 1, []))   # 5A is held
+        self.assertIsNotNone(reserve("Wes", "P38", "5A", "Standard", self.test_db, hold_id=hold_id))
+
+    def test_seat_holds(self):
+        hold_id = hold_seat("5a", self.test_db)
+        self.assertIsNotNone(hold_id)
+        self.assertIsNone(hold_seat("5A", self.test_db))   # Already held
+        self.assertFalse(is_seat_available("5A", self.test_db))
+        self.assertTrue(is_seat_available("5A", self.test_db, hold_id=hold_id))   # Free for its holder
+        self.assertFalse(is_seat_reserved("5A", self.test_db))   # Held, not booked
+        self.assertEqual(get_seat_map(self.test_db, include_holds=True).occupancy(), "0000H00000")
+        self.assertIsNone(reserve("Gil", "P40", "5A", "Standard", self.test_db))   # Someone else cannot book it
+        self.assertEqual(reserve_many([("Gil", "P40", "5A", "Standard")], self.test_db)[1],
+                         [(0, "Seat 5A is held by another booking.")])
+        writes = GroupCommitQueue(self.test_db)
+        self.assertIsNone(writes.reserve("Gil", "P40", "5A", "Standard").result(timeout=5))
+        self.assertIsNotNone(writes.reserve("Hal", "P41", "5A", "Halal", hold_id=hold_id).result(timeout=5))
+        writes.close()
+        self.assertFalse(release_hold(hold_id, self.test_db))   # Used up by the booking
+        self.assertIsNone(hold_seat("5A", self.test_db))   # Booked seats cannot be held
+        group_hold = hold_seat("8A", self.test_db)
+        booked, failures = reserve_many([("Jo", "P43", "8A", "Standard"), ("Kay", "P44", "9A", "Halal")],
+                                        self.test_db, hold_ids=[group_hold])   # The group's own hold
+        self.assertEqual((len(booked), failures), (2, []))
+        self.assertFalse(release_hold(group_hold, self.test_db))   # Used up by the group booking
+
+        short = hold_seat("6A", self.test_db, seconds=0.05)
+        self.assertIsNotNone(short)
+        time.sleep(0.1)
+        self.assertTrue(is_seat_available("6A", self.test_db))   # Expired holds stop counting at once
+        other = hold_seat("6A", self.test_db)   # and can be taken over
+        self.assertIsNotNone(other)
+        self.assertTrue(release_hold(other, self.test_db))
+        self.assertIsNotNone(reserve("Ivy", "P42", "6A", "Standard", self.test_db, hold_id=short))
+
+        sweeper = get_hold_sweeper(self.test_db)
+        swept = sweeper.swept
+        hold_seat("7A", self.test_db, seconds=0.05)
+        for _ in range(100):   # The sweeper wakes up when the hold expires and deletes it
+            if sweeper.swept > swept:
+                break
+            time.sleep(0.02)
+        with get_pool(self.test_db).connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM seat_holds").fetchone()[0], 0)
+
+    def test_hold_sweeper_retries_failed_sweeps(self):
+        self.addCleanup(setattr, booking_system, "SWEEP_RETRY_DELAY", booking_system.SWEEP_RETRY_DELAY)
+        booking_system.SWEEP_RETRY_DELAY = 0.05
+        sweeper = get_hold_sweeper(self.test_db)
+        hold_seat("7A", self.test_db, seconds=0.2)
+        with get_pool(self.test_db).connection() as conn:
+            conn.execute("ALTER TABLE seat_holds RENAME TO seat_holds_away")   # The sweep fails while it is gone
+            time.sleep(0.4)
+            conn.execute("ALTER TABLE seat_holds_away RENAME TO seat_holds")
+        for _ in range(100):   # The sweeper keeps retrying and deletes the hold once it can
+            if sweeper.swept:
+                break
+            time.sleep(0.02)
+        self.assertEqual(sweeper.swept, 1)
+
+    def test_hold_sweeper_lock_order(self):
+        close_pool(self.test_db)
+        sweeper = SeatHoldSweeper(self.test_db)
+        with booking_system._pools_lock:   # Held by close_pool() while it closes the sweepers
+            starter = threading.Thread(target=sweeper.schedule, args=(time.time() + 60,), daemon=True)
+            starter.start()   # Starting the thread must not need _pools_lock
+            starter.join(timeout=5)
+            self.assertFalse(starter.is_alive())
+            sweeper.close()
+        self.assertNotIn(os.path.abspath(self.test_db), booking_system._pools)   # The closed pool stays closed
+
+    def test_group_commit_queue(self):
+        writes = GroupCommitQueue(self.test_db, max_batch=100, max_delay=0.2)   # Long delay: one batch
+        existing = reserve("Oli", "P15", "2A", "Standard", self.test_db)
+        first = writes.reserve("Pat", "P16", "1a", "Standard")
+        second = writes.reserve("Quin", "P17", "1A", "Halal")   # Same seat in the same batch
+        cancelled = writes.cancel(existing)
+        freed = writes.reserve("Rae", "P18", "2A", "Standard")   # Seat freed earlier in the batch
+        invalid = writes.reserve("Sam", "P19", "11A", "Standard")
+        self.assertIsNotNone(first.result(timeout=5))
+        self.assertIsNone(second.result(timeout=5))   # Lost the seat to the earlier reservation
+        self.assertTrue(cancelled.result(timeout=5))
+        self.assertIsNotNone(freed.result(timeout=5))
+        with self.assertRaises(ValueError):
+            invalid.result(timeout=5)
+        writes.close()
+        self.assertEqual((writes.commits, writes.operations), (1, 4))   # Four writes, one commit
+        self.assertEqual(find_booking(freed.result(), self.test_db).name, "Rae")
+
+    def test_group_commit_queue_survives_failed_batch(self):
+        writes = GroupCommitQueue(self.test_db, max_delay=0.01)
+        allocator = get_id_allocator(self.test_db)
+        def locked(count):
+            del allocator.allocate   # Fail once, like a write lock held by a long import
+            raise sqlite3.OperationalError("database is locked")
+        allocator.allocate = locked
+        failed = writes.reserve("Tia", "P20", "3A", "Standard")
+        with self.assertRaises(sqlite3.OperationalError):
+            failed.result(timeout=5)   # The batch fails instead of hanging
+        self.assertIsNotNone(writes.reserve("Tia", "P20", "3A", "Standard").result(timeout=5))   # Thread still runs
+        writes.close()
+
+    def test_seat_cache(self):
+        cache = enable_seat_cache(max_entries=3)
+        self.addCleanup(disable_seat_cache)
+        self.assertFalse(is_seat_reserved("1A", self.test_db))   # Miss, read from disk
+        self.assertFalse(is_seat_reserved("1A", self.test_db))   # Hit
+        booking_id = reserve("Tom", "P20", "1A", "Standard", self.test_db)
+        self.assertTrue(is_seat_reserved("1A", self.test_db))   # Updated by the write, still a hit
+        self.assertTrue(get_seat_map(self.test_db).is_reserved("1A"))   # Miss, seat map cached
+        cancel(booking_id, self.test_db)
+        self.assertFalse(is_seat_reserved("1A", self.test_db))   # Updated by the cancellation
+        self.assertFalse(get_seat_map(self.test_db).is_reserved("1A"))   # Cached map updated in place
+        for seat in ("2A", "3A", "4A"):
+            is_seat_reserved(seat, self.test_db)   # Fill past max_entries
+        self.assertEqual(cache.stats(), {"hits": 4, "misses": 5, "evictions": 2, "entries": 3, "max_entries": 3})
+
+    def test_seat_cache_ttl(self):
+        enable_seat_cache(ttl=0)   # Entries expire at once, as for a database shared between processes
+        self.addCleanup(disable_seat_cache)
+        self.assertFalse(is_seat_reserved("6A", self.test_db))
+        conn = sqlite3.connect(self.test_db)   # Another program books the seat behind the cache's back
+        conn.execute("INSERT INTO bookings (id, name, passport, seat, meal_code) VALUES ('EXT00001', 'Uma', 'P21', '6A', NULL)")
+        conn.commit()
+        conn.close()
+        self.assertTrue(is_seat_reserved("6A", self.test_db))
+
+    def test_metrics(self):
+        metrics.reset()
+        metrics.enable()
+        self.addCleanup(metrics.disable)
+        statements = []
+        metrics.enable_sql_trace(statements.append, progress_steps=10)
+        self.addCleanup(metrics.disable_sql_trace)
+        reserve("Vic", "P22", "3A", "Standard", self.test_db)
+        self.assertTrue(is_seat_reserved("3A", self.test_db))
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["operations"]["reserve"]["count"], 1)
+        self.assertEqual(snapshot["operations"]["is_seat_reserved"]["count"], 1)
+        self.assertGreaterEqual(snapshot["counters"]["commits"], 1)
+        self.assertGreater(snapshot["counters"]["statements"], 2)
+        self.assertGreater(snapshot["counters"]["vm_progress_calls"], 0)
+        self.assertTrue(any(sql.startswith("INSERT INTO bookings") for sql in statements))   # SQL trace
+        text = metrics.to_prometheus()
+        self.assertIn('booking_operation_seconds_count{operation="reserve"} 1', text)
+        self.assertIn('booking_operation_seconds_bucket{operation="reserve",le="+Inf"} 1', text)
+        metrics.dump(self.test_db + ".json", "json")   # Snapshot written to a local file
+        with open(self.test_db + ".json") as file:
+            self.assertEqual(json.load(file)["operations"]["reserve"]["count"], 1)
+        os.remove(self.test_db + ".json")
+        metrics.disable()
+        reserve("Wyn", "P23", "4A", "Standard", self.test_db)
+        self.assertEqual(metrics.snapshot()["operations"]["reserve"]["count"], 1)   # Nothing recorded when off
+
+    def test_load_simulator(self):
+        results = load_simulator.run_suite(bookings=600, ops=40)   # Tiny run of every workload
+        self.assertEqual(results["meta"]["flights"], 3)   # Half-full 500-seat flights
+        for workload, result in results["workloads"].items():
+            self.assertGreater(result["ops"], 0, workload)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+        slower = json.loads(json.dumps(results))
+        slower["workloads"]["booking_rush"]["throughput"] /= 2   # Pretend this run halved throughput
+        self.assertEqual(load_simulator.compare(results, results), [])
+        self.assertEqual(len(load_simulator.compare(slower, results, tolerance=0.2)), 1)
+
+class TestShardedStore(unittest.TestCase):
+    test_db = "test_shards.db"
+
+    def tearDown(self):
+        for shard in range(3):
+            remove_test_database(shard_path(self.test_db, shard))
+
+    def test_routing(self):
+        with ShardedBookingStore(self.test_db, shards=3, processes=False) as store:
+            flights = [f"SH{number:03d}" for number in range(12)]
+            for flight in flights:
+                store.add_flight(flight, 5, "AB")
+            self.assertEqual({store.shard_of(flight) for flight in flights}, {0, 1, 2})   # Spread over every shard
+            self.assertEqual([row[0] for row in store.list_flights()], sorted(flights + ["AA001"]))
+            booked = {flight: store.reserve("Ann", "P1", "1A", "Standard", flight) for flight in flights}
+            self.assertIsNone(store.reserve("Bob", "P2", "1A", "Standard", flights[0]))   # Seat taken
+            self.assertEqual(len(set(booked.values())), len(flights))   # Numbers are unique across shards
+            for flight, booking_id in booked.items():
+                self.assertTrue(store.is_seat_reserved("1A", flight))
+                self.assertEqual(find_booking(booking_id, store.path_of(flight)).flight, flight)   # Stored on its shard
+                self.assertEqual(store.find_booking(booking_id).flight, flight)
+            self.assertEqual(len(store.find_by_passport("P1")), len(flights))
+            self.assertEqual(len(store.search_by_name("an", limit=5)), 5)
+            self.assertEqual([booking.id for booking in store.iter_bookings(order_by="id")], sorted(booked.values()))
+            self.assertTrue(store.cancel(booked[flights[0]]))
+            self.assertFalse(store.cancel(booked[flights[0]]))
+            self.assertFalse(store.is_seat_reserved("1A", flights[0]))
+        with self.assertRaises(ValueError):
+            ShardedBookingStore(self.test_db, shards=2, processes=False)   # Files belong to a 3-shard store
+
+    def test_worker_processes(self):
+        with ShardedBookingStore(self.test_db, shards=2) as store:
+            store.add_flight("PR001", 5, "AB")
+            futures = [store.submit_reserve(f"P{row}", "P3", f"{row}A", "Standard", "PR001") for row in range(1, 6)]
+            self.assertTrue(all(future.result(timeout=30) for future in futures))
+            self.assertEqual(store.get_seat_map("PR001").reserved_count(), 5)   # Written by the worker process
+            with self.assertRaises(ValueError):
+                store.reserve("Cy", "P4", "9Z", "Standard", "PR001")   # Errors come back from the worker
+
+class TestBookingServer(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.test_db = "test_server.db"   # Separate database for the server tests
+        create_test_database(self.test_db)
+
+    def tearDown(self):
+        remove_test_database(self.test_db)
+
+    async def test_json_lines_protocol(self):
+        server = BookingServer(self.test_db)
+        listener = await server.start(port=0)   # Any free port
+        reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+
+        async def call(**request):
+            writer.write(json.dumps(request).encode() + b"\n")
+            return json.loads(await reader.readline())
+
+        reply = await call(op="reserve", name="Ann", passport="P1", seat="4A", tag=1)
+        self.assertTrue(reply["ok"])
+        self.assertEqual(reply["tag"], 1)   # Tags are echoed back
+        booking_id = reply["result"]["booking_id"]
+        self.assertFalse((await call(op="reserve", name="Bob", passport="P2", seat="4A"))["ok"])   # Seat taken
+        self.assertEqual((await call(op="seat_map"))["result"]["occupancy"], "0001000000")   # Only 4A reserved
+        self.assertEqual((await call(op="lookup", booking_id=booking_id))["result"]["name"], "Ann")
+        hold_id = (await call(op="hold", seat="5A"))["result"]["hold_id"]
+        self.assertEqual((await call(op="seat_map"))["result"]["occupancy"], "0001H00000")
+        self.assertFalse((await call(op="reserve", name="Bob", passport="P2", seat="5A"))["ok"])   # Held
+        self.assertTrue((await call(op="reserve", name="Cy", passport="P3", seat="5A", hold_id=hold_id))["ok"])
+        hold_id = (await call(op="hold", seat="6A"))["result"]["hold_id"]
+        self.assertTrue((await call(op="release", hold_id=hold_id))["result"]["released"])
+        self.assertFalse((await call(op="release", hold_id=hold_id))["result"]["released"])   # Already released
+        self.assertEqual(server._writes.operations, 8)   # Holds and releases went through the writer queue too
+        self.assertEqual((await call(op="search", passport="P1"))["result"][0]["booking_id"], booking_id)
+        self.assertEqual((await call(op="search", name="an"))["result"][0]["seat"], "4A")
+        self.assertTrue((await call(op="cancel", booking_id=booking_id))["result"]["cancelled"])
+        self.assertFalse((await call(op="fly"))["ok"])   # Unknown operation
+        self.assertEqual((await call(op="lookup"))["error"], "Missing field: booking_id")
+
+        writer.close()
+        await writer.wait_closed()
+        await server.close()
+
 # Main programme entry: running test cases
 if __name__ == '__main__':
     unittest.main()   # Start unit tests